@@ -1,53 +1,154 @@
 from __future__ import annotations
 
+import logging
+from time import monotonic
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
 
-from .sensor import BernerBoxCoordinator  # nur die Klasse, kein DOMAIN-Import
+from .api import BernerBoxApiClient
+from .commands import BernerBoxCommandQueue
+from .config_flow import resolve_options
+from .const import (
+    DOMAIN,
+    CONF_FAST_INTERVAL,
+    CONF_IDLE_INTERVAL,
+    CONF_IMPULSE_DEBOUNCE,
+    CONF_REQUEST_TIMEOUT,
+    CONF_SAFETY_INTERVAL,
+    CONF_SETTLE_DELAY,
+    STORAGE_VERSION,
+    STORAGE_KEY,
+)
+from .coordinator import BernerBoxCoordinator, BernerBoxSettingsCoordinator
+from .scheduler import async_get_fleet_scheduler
+from .services import async_setup_services
 
-DOMAIN = "bernerbox"
+PLATFORMS: list[Platform] = [
+    Platform.BINARY_SENSOR,
+    Platform.BUTTON,
+    Platform.COVER,
+    Platform.SWITCH,
+    Platform.SENSOR,
+]
 
-# ➕ SWITCH hinzu
-PLATFORMS: list[Platform] = [Platform.BUTTON, Platform.COVER, Platform.SWITCH, Platform.SENSOR]
+_LOGGER = logging.getLogger(__name__)
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    t0 = monotonic()
     data = dict(entry.data)  # host, api_key, ids, request_timeout, user_id
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = data
 
     host: str = data["host"].rstrip("/")
     api_key: str = data["api_key"]
-    timeout: int = int(data.get("request_timeout", 6))
+    opts = resolve_options(entry)  # Profil/Optionen (live änderbar, siehe _async_options_updated)
+    timeout = opts[CONF_REQUEST_TIMEOUT]
     user_id: int = int(data.get("user_id", 1))
     ids = list(map(int, data.get("ids", []))) or list(range(1, 21))
 
+    # Domain-weiter Scheduler: Slot im Poll-Raster + globale Request-Grenze
+    fleet = async_get_fleet_scheduler(hass)
+    fleet.register(entry.entry_id)
+
+    # Ein API-Client (Pool + Limits) und genau ein Coordinator pro Entry – alle Plattformen teilen sie
+    api = BernerBoxApiClient(
+        hass, host=host, api_key=api_key, user_id=user_id, timeout=timeout, fleet_semaphore=fleet.semaphore
+    )
     coordinator = BernerBoxCoordinator(
         hass,
-        host=host,
-        api_key=api_key,
-        user_id=user_id,
-        timeout=timeout,
+        entry_id=entry.entry_id,
+        api=api,
         ids=ids,
+        fleet=fleet,
+        fast_interval=opts[CONF_FAST_INTERVAL],
+        idle_interval=opts[CONF_IDLE_INTERVAL],
+        timeout=timeout,
+        safety_interval=opts[CONF_SAFETY_INTERVAL],
+        settle_delay=opts[CONF_SETTLE_DELAY],
     )
-    await coordinator.async_config_entry_first_refresh()
+    # Mit Cache: Entities sofort aus den letzten bekannten Daten, erster Live-Refresh im Hintergrund.
+    # Ohne Cache: einziger Listen-Fetch beim Start – Namen/Zustände teilen sich alle Plattformen.
+    t_refresh = monotonic()
+    cached = await coordinator.async_load_cache()
+    if cached:
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {host}"
+        )
+    else:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            hass.data[DOMAIN].pop(entry.entry_id, None)
+            fleet.unregister(entry.entry_id)
+            await api.async_close()
+            raise
+    t_platforms = monotonic()
 
     store = hass.data[DOMAIN][entry.entry_id]
+    store["api"] = api
+    store["commands"] = BernerBoxCommandQueue(hass, api, debounce=opts[CONF_IMPULSE_DEBOUNCE])
     store["coordinator"] = coordinator
-    store["names"] = dict(getattr(coordinator, "names", {}))
+    # Box-Einstellungen: ein gemeinsamer, gecachter Abruf für alle Box-Entities (blockiert den Start nicht)
+    settings = BernerBoxSettingsCoordinator(hass, api=api)
+    store["settings"] = settings
+    entry.async_create_background_task(hass, settings.async_refresh(), f"{DOMAIN} settings {host}")
+    store["names"] = coordinator.names  # dasselbe Dict: wächst mit neu erkannten Items
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+    t_end = monotonic()
+    _LOGGER.debug(
+        "BernerBox %s: setup %.2fs (init %.2fs, %s %.2fs [%d list request(s)], platforms %.2fs)",
+        host, t_end - t0, t_refresh - t0, "cache load" if cached else "first refresh",
+        t_platforms - t_refresh, coordinator.list_requests, t_end - t_platforms,
+    )
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Optionen live auf API, Coordinator und Befehls-Queue anwenden – kein Reload, Entities bleiben."""
+    store = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if not store:
+        return
+    opts = resolve_options(entry)
+    store["api"].timeout = opts[CONF_REQUEST_TIMEOUT]
+    store["commands"].debounce = opts[CONF_IMPULSE_DEBOUNCE]
+    store["coordinator"].apply_options(
+        fast_interval=opts[CONF_FAST_INTERVAL],
+        idle_interval=opts[CONF_IDLE_INTERVAL],
+        timeout=opts[CONF_REQUEST_TIMEOUT],
+        safety_interval=opts[CONF_SAFETY_INTERVAL],
+        settle_delay=opts[CONF_SETTLE_DELAY],
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if ok:
-        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        store = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None) or {}
+        commands = store.get("commands")
+        if commands is not None:
+            await commands.async_stop()
+        for key in ("coordinator", "settings"):
+            if (coord := store.get(key)) is not None:
+                await coord.async_shutdown()
+        api = store.get("api")
+        if api is not None:
+            await api.async_close()
+        async_get_fleet_scheduler(hass).unregister(entry.entry_id)
     return ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Persistenten Item-Cache beim Löschen des Eintrags entfernen."""
+    await Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=entry.entry_id)).async_remove()
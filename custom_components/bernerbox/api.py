@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import logging
+from time import monotonic
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import ClientTimeout
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant
+from homeassistant.util.json import json_loads
+
+from .breaker import BernerBoxCircuitBreaker
+from .const import BOX_MAX_CONNECTIONS, BOX_KEEPALIVE_TIMEOUT, UPDATEALL_TIMEOUT
+from .metrics import CallTrace, EndpointMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rückgabe von get_items_raw bei HTTP 304 (Liste unverändert seit der letzten Antwort); Vergleich mit `is` –
+# eigenes Objekt, damit ein leerer 200-Body nicht als „unverändert“ gilt
+NOT_MODIFIED: Any = object()
+
+
+@dataclass(frozen=True, slots=True)
+class CommandResult:
+    """Quittung eines Befehls: angenommen (ok), per Funk gesendet (radio_executed) oder Fehlercode."""
+
+    ok: bool
+    radio_executed: bool = False
+    error_code: str | None = None
+
+
+class BernerBoxApiClient:
+    """
+    Ein API-Client pro Box (Config-Entry):
+    - eigener, kleiner Connection-Pool mit Keep-Alive (der Webserver der Box ist schwach)
+    - Semaphore begrenzt gleichzeitige Requests an die Box
+    - Endpunkte + Antwort-Auswertung an einer Stelle
+    - Laufzeit-Metriken je Endpunkt (Anzahl, Fehler, Timeouts, Latenz, Bytes)
+    - Schutzschalter: bei nicht erreichbarer Box sofort fehlschlagen statt auf Timeouts zu warten
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        *,
+        host: str,
+        api_key: str | None = None,
+        user_id: int = 1,
+        timeout: float = 6,
+        session: aiohttp.ClientSession | None = None,
+        fleet_semaphore: asyncio.Semaphore | None = None,
+    ) -> None:
+        self._hass = hass
+        self.host = host.rstrip("/")
+        self._api_key = api_key
+        self.user_id = int(user_id)
+        self.timeout = float(timeout)
+        self._owns_session = session is None
+        self._session = session
+        self._sem = asyncio.Semaphore(BOX_MAX_CONNECTIONS)
+        self._fleet_sem = fleet_semaphore
+        self.metrics: Dict[str, EndpointMetrics] = {}
+        self.trace = CallTrace()
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self.breaker = BernerBoxCircuitBreaker()
+        self.closed = False                   # nach async_close keine neuen Requests/Sessions mehr
+        self._unsub_close: CALLBACK_TYPE | None = None
+
+    # ------------------ Session ------------------
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.closed:
+            # noch laufende Requests nach dem Entladen dürfen keine neue (nie geschlossene) Session anlegen
+            raise RuntimeError("BernerBox API client is closed")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=BOX_MAX_CONNECTIONS,
+                limit_per_host=BOX_MAX_CONNECTIONS,
+                keepalive_timeout=BOX_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+            if self._unsub_close is None:
+                # HA entlädt Entries beim Beenden nicht – eigene Session wie die von HA beim Schließen zumachen
+                self._unsub_close = self._hass.bus.async_listen_once(
+                    EVENT_HOMEASSISTANT_CLOSE, self._async_close_on_shutdown
+                )
+        return self._session
+
+    async def _async_close_on_shutdown(self, _event: Event) -> None:
+        self._unsub_close = None
+        await self.async_close()
+
+    async def async_close(self) -> None:
+        self.closed = True
+        if self._unsub_close is not None:
+            self._unsub_close()
+            self._unsub_close = None
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    @asynccontextmanager
+    async def _limits(self) -> AsyncIterator[None]:
+        """Lokale (diese Box) und globale (alle Boxen) Parallelitätsgrenze.
+
+        Erst der Box-Slot, dann der globale: wer auf eine ausgelastete Box wartet (z.B. laufendes
+        updateAll), belegt keinen der wenigen globalen Slots.
+        """
+        if self._fleet_sem is None:
+            async with self._sem:
+                yield
+            return
+        async with self._sem, self._fleet_sem:
+            yield
+
+    # ------------------ URLs ------------------
+
+    def _url(self, path: str, **query: Any) -> str:
+        params = dict(query)
+        if self._api_key:
+            params = {"api_key": self._api_key, **params}
+        qs = "&".join(f"{k}={v}" for k, v in params.items())
+        return f"{self.host}{path}?{qs}" if qs else f"{self.host}{path}"
+
+    @staticmethod
+    def _path(url: str) -> str:
+        """URL ohne Query (api_key) für Logs."""
+        return url.split("?", 1)[0]
+
+    # ------------------ Metriken ------------------
+
+    def _record(
+        self,
+        endpoint: str,
+        started: float,
+        *,
+        size: int = 0,
+        error: bool = False,
+        timeout: bool = False,
+        unreachable: bool = False,
+        status: int | None = None,
+        outcome: str = "ok",
+    ) -> None:
+        latency = monotonic() - started
+        metrics = self.metrics.get(endpoint)
+        if metrics is None:
+            metrics = self.metrics[endpoint] = EndpointMetrics()
+        metrics.record(latency, size=size, error=error, timeout=timeout)
+        self.trace.add(endpoint, latency, status=status, size=size, outcome=outcome)
+        # Schutzschalter: nur Verbindungsfehler/Timeouts zählen, nur eine echte HTTP-Antwort heißt „erreichbar“
+        # (sonstige Ausnahmen, z.B. Client geschlossen oder Decode-Fehler, sagen über die Box nichts aus)
+        if timeout or unreachable:
+            self.breaker.record_failure()
+        elif status is not None:
+            self.breaker.record_success()
+
+    def metrics_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Statistik aller bisher genutzten Endpunkte (für Diagnose/Sensoren)."""
+        return {endpoint: m.as_dict() for endpoint, m in self.metrics.items()}
+
+    def _blocked(self, endpoint: str) -> bool:
+        """Client geschlossen oder Schutzschalter offen → Request wird nicht gesendet."""
+        if self.closed:
+            return True
+        if self.breaker.allow_request():
+            return False
+        self.trace.add(endpoint, 0.0, status=None, size=0, outcome="breaker_open")
+        return True
+
+    # ------------------ Low-Level ------------------
+
+    async def _get_bytes(
+        self, endpoint: str, url: str, timeout: float | None = None, *, conditional: bool = False
+    ) -> Any:
+        """
+        HTTP-GET als Rohbytes (fehlertolerant, None bei Fehler).
+        conditional=True: ETag/Last-Modified der letzten Antwort mitschicken; 304 → NOT_MODIFIED.
+        """
+        if self._blocked(endpoint):
+            return None
+        headers = {"Accept": "application/json"}
+        if conditional:
+            headers.update(self._validators.get(endpoint, {}))
+        started = monotonic()
+        try:
+            async with self._limits():
+                started = monotonic()  # Latenz ohne Wartezeit an den Semaphoren
+                async with self._get_session().get(
+                    url, timeout=ClientTimeout(total=timeout or self.timeout), headers=headers
+                ) as resp:
+                    if conditional and resp.status == 304:
+                        self._record(endpoint, started, status=304, outcome="not_modified")
+                        return NOT_MODIFIED
+                    raw = await resp.read()
+                    if resp.status != 200:
+                        self._record(
+                            endpoint, started, size=len(raw), error=True, status=resp.status, outcome=f"http_{resp.status}"
+                        )
+                        _LOGGER.debug("GET %s -> %s %s", self._path(url), resp.status, raw[:200])
+                        return None
+                    if conditional:
+                        self._remember_validators(endpoint, resp.headers)
+            self._record(endpoint, started, size=len(raw), status=200)
+            return raw
+        except asyncio.TimeoutError:
+            self._record(endpoint, started, error=True, timeout=True, outcome="timeout")
+            _LOGGER.debug("GET timeout %s", self._path(url))
+            return None
+        except Exception as e:
+            self._record(
+                endpoint, started, error=True, unreachable=isinstance(e, aiohttp.ClientError), outcome=type(e).__name__
+            )
+            _LOGGER.debug("GET fail %s (%s)", self._path(url), e)
+            return None
+
+    def _remember_validators(self, endpoint: str, headers: Any) -> None:
+        """ETag/Last-Modified (falls die Box sie sendet) für den nächsten bedingten Request merken."""
+        validators: Dict[str, str] = {}
+        if etag := headers.get("ETag"):
+            validators["If-None-Match"] = etag
+        if modified := headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = modified
+        if validators:
+            self._validators[endpoint] = validators
+        else:
+            self._validators.pop(endpoint, None)
+
+    async def _get_json(self, endpoint: str, url: str, timeout: float | None = None) -> Optional[Any]:
+        """HTTP-GET als JSON (fehlertolerant)."""
+        raw = await self._get_bytes(endpoint, url, timeout)
+        if raw is None:
+            return None
+        try:
+            return json_loads(raw)
+        except ValueError as e:
+            _LOGGER.debug("GET %s invalid JSON (%s)", self._path(url), e)
+            return None
+
+    @staticmethod
+    def _parse_ack(status: int, raw: bytes) -> CommandResult:
+        """Quittung der Box auswerten: `true` oder {"status": "OK", "info": "funk_command_executed"}."""
+        if status != 200:
+            return CommandResult(ok=False, error_code=f"http_{status}")
+        try:
+            body = json_loads(raw)
+        except ValueError:
+            return CommandResult(ok=False, error_code="invalid_json")
+        if body is True:
+            return CommandResult(ok=True)
+        if isinstance(body, dict):
+            info = body.get("info")
+            radio = isinstance(info, (str, list)) and "funk_command_executed" in info
+            if str(body.get("status", "")).upper() == "OK" or radio:
+                return CommandResult(ok=True, radio_executed=radio)
+            return CommandResult(ok=False, error_code=str(info or body.get("status") or "rejected"))
+        return CommandResult(ok=False, error_code="unexpected_response")
+
+    async def _post_command(
+        self,
+        endpoint: str,
+        url: str,
+        *,
+        json: dict | None = None,
+        form: Dict[str, str] | None = None,
+        headers: Dict[str, str] | None = None,
+    ) -> CommandResult:
+        """POST (JSON oder Formular) und Quittung einmalig aus den Bytes dekodieren."""
+        if self._blocked(endpoint):
+            return CommandResult(ok=False, error_code="unreachable")
+        started = monotonic()
+        try:
+            async with self._limits():
+                started = monotonic()
+                async with self._get_session().post(
+                    url,
+                    json=json,
+                    data=form,
+                    timeout=ClientTimeout(total=self.timeout),
+                    headers={"Accept": "application/json", **(headers or {})},
+                ) as resp:
+                    raw = await resp.read()
+                    result = self._parse_ack(resp.status, raw)
+                    _LOGGER.debug(
+                        "POST %s payload=%s -> %s %s", self._path(url), json or form, resp.status, raw[:200]
+                    )
+            if result.radio_executed:
+                outcome = "funk_command_executed"
+            else:
+                outcome = "ok" if result.ok else result.error_code or "rejected"
+            self._record(endpoint, started, size=len(raw), error=not result.ok, status=resp.status, outcome=outcome)
+            return result
+        except asyncio.TimeoutError:
+            self._record(endpoint, started, error=True, timeout=True, outcome="timeout")
+            _LOGGER.debug("POST timeout %s", self._path(url))
+            return CommandResult(ok=False, error_code="timeout")
+        except Exception as e:
+            self._record(
+                endpoint, started, error=True, unreachable=isinstance(e, aiohttp.ClientError), outcome=type(e).__name__
+            )
+            _LOGGER.debug("POST fail %s (%s)", self._path(url), e)
+            return CommandResult(ok=False, error_code="cannot_connect")
+
+    # ------------------ Endpunkte ------------------
+
+    async def get_items_raw(self, timeout: float | None = None) -> Any:
+        """GET getItemsByUser als Rohbytes (bedingt, falls die Box ETag/Last-Modified liefert).
+
+        None = Fehler, NOT_MODIFIED = 304 (unverändert), sonst der Body (auch leer).
+        """
+        return await self._get_bytes(
+            "getItemsByUser", self._url(f"/api/item/getItemsByUser.json/{self.user_id}"), timeout, conditional=True
+        )
+
+    async def update_all(self) -> None:
+        """Stößt updateAllItemsByUser an (Box pollt danach alle Items; Request mit Obergrenze)."""
+        if self._blocked("updateAllItemsByUser"):
+            return
+        url = self._url(f"/api/item/updateAllItemsByUser.json/{self.user_id}")
+        started = monotonic()
+        try:
+            # nur Box-Limit: updateAll läuft lange und soll keinen globalen Slot blockieren
+            async with self._sem:
+                started = monotonic()
+                async with self._get_session().get(
+                    url, timeout=ClientTimeout(total=UPDATEALL_TIMEOUT), headers={"Accept": "application/json"}
+                ) as resp:
+                    raw = await resp.read()
+            ok = resp.status == 200
+            self._record(
+                "updateAllItemsByUser",
+                started,
+                size=len(raw),
+                error=not ok,
+                status=resp.status,
+                outcome="ok" if ok else f"http_{resp.status}",
+            )
+        except asyncio.TimeoutError:
+            self._record("updateAllItemsByUser", started, error=True, timeout=True, outcome="timeout")
+            _LOGGER.debug("updateAll timeout after %ss", UPDATEALL_TIMEOUT)
+        except Exception as e:
+            self._record(
+                "updateAllItemsByUser",
+                started,
+                error=True,
+                unreachable=isinstance(e, aiohttp.ClientError),
+                outcome=type(e).__name__,
+            )
+            _LOGGER.debug("updateAll error: %s", e)
+
+    async def probe(self) -> bool:
+        """
+        Günstige Erreichbarkeitsprobe bei offenem Schutzschalter (nur wenn fällig):
+        HEAD auf die Startseite ohne api_key – jede HTTP-Antwort heißt „erreichbar“.
+        True, wenn die Box wieder erreichbar ist.
+        """
+        if self.closed or not self.breaker.probe_due():
+            return False
+        started = monotonic()
+        try:
+            async with self._limits():
+                started = monotonic()
+                async with self._get_session().head(
+                    f"{self.host}/", timeout=ClientTimeout(total=self.timeout), allow_redirects=False
+                ) as resp:
+                    status = resp.status
+            self._record("probe", started, status=status)
+        except asyncio.TimeoutError:
+            self._record("probe", started, error=True, timeout=True, outcome="timeout")
+        except Exception as e:
+            self._record(
+                "probe", started, error=True, unreachable=isinstance(e, aiohttp.ClientError), outcome=type(e).__name__
+            )
+            _LOGGER.debug("probe fail %s (%s)", self.host, e)
+        return not self.breaker.is_open
+
+    async def execute_item_function(self, item_id: int, func_id: int) -> CommandResult:
+        """Impuls senden; radio_executed=True erst, wenn die Box den Funkbefehl gesendet hat."""
+        payload = {"id_item": int(item_id), "id_item_function": int(func_id)}
+        return await self._post_command(
+            "executeItemFunction", self._url("/api/item/executeItemFunction.json"), json=payload
+        )
+
+    async def restart_system(self) -> bool:
+        # @url UPDATE-Route: POST + X-HTTP-Method-Override
+        result = await self._post_command(
+            "restartSystem",
+            self._url("/api/v1/Box/restartSystem", format="json"),
+            headers={"X-HTTP-Method-Override": "UPDATE"},
+        )
+        return result.ok
+
+    async def get_all_settings(self) -> Optional[List[Dict[str, Any]]]:
+        data = await self._get_json("getAllSettings", self._url("/api/v1/BoxSettings/getAllSettings", format="json"))
+        return data if isinstance(data, list) else None
+
+    async def toggle_ssh_access(self, mode: str) -> bool:
+        result = await self._post_command(
+            "toggleSSHAccess", self._url("/api/v1/Box/toggleSSHAccess", format="json"), form={"mode": mode}
+        )
+        return result.ok
+
+    # ------------------ Config-Flow ------------------
+
+    async def auth_user(self, username: str, password: str) -> Tuple[Optional[Any], Optional[str]]:
+        """POST /api/v1/User/authUser → (json, error)."""
+        payload = {"username": username, "password": password, "uuid": ""}
+        try:
+            async with self._get_session().post(
+                f"{self.host}/api/v1/User/authUser",
+                data=payload,
+                timeout=ClientTimeout(total=self.timeout),
+                headers={"Accept": "application/json"},
+            ) as resp:
+                if resp.status != 200:
+                    return None, f"http_{resp.status}"
+                try:
+                    return json_loads(await resp.read()), None
+                except Exception:
+                    return None, "invalid_json"
+        except Exception:
+            return None, "cannot_connect"
+
+    async def fetch_items_checked(self) -> Tuple[Optional[Any], Optional[str]]:
+        """GET getItemsByUser mit Fehlercode statt None → (json, error)."""
+        try:
+            async with self._get_session().get(
+                self._url(f"/api/item/getItemsByUser.json/{self.user_id}"),
+                timeout=ClientTimeout(total=self.timeout),
+                headers={"Accept": "application/json"},
+            ) as resp:
+                if resp.status != 200:
+                    return None, "http_error"
+                try:
+                    return json_loads(await resp.read()), None
+                except Exception:
+                    return None, "invalid_json"
+        except Exception:
+            return None, "cannot_connect"
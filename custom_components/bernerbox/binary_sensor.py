@@ -1,45 +1,56 @@
 from __future__ import annotations
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, List
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import DOMAIN
-from .coordinator import async_get_coordinator, BernerBoxCoordinator
-from .sensor import STATUS_MAP, NUM_STATUS_MAP, TEXT_FALLBACK
+from .const import DOMAIN, SIGNAL_ITEMS_ADDED
+from .coordinator import async_get_coordinator, BernerBoxCoordinator, ItemState
 
 _LOGGER = logging.getLogger(__name__)
 
 GARAGE_ITEM_TYPES = {"1", "2"}  # aus Backend: 1 vertikal, 2 horizontal
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
-    coord: BernerBoxCoordinator = await async_get_coordinator(hass, entry.entry_id)
-    ids: List[int] = list(map(int, hass.data[DOMAIN][entry.entry_id].get("ids", []))) or list(range(1, 21))
-    entities: List[BernerBoxDoorBinarySensor] = []
-    for iid in ids:
-        name = coord.names.get(iid, f"Item {iid}")
-        entities.append(
+    coord: BernerBoxCoordinator = async_get_coordinator(hass, entry.entry_id)
+
+    def _door_sensors(item_ids: List[int]) -> List[BernerBoxDoorBinarySensor]:
+        return [
             BernerBoxDoorBinarySensor(
                 coordinator=coord,
                 entry_id=entry.entry_id,
                 item_id=iid,
-                display_name=f"{name} Türstatus",
-                base_name=name,
+                display_name=f"{coord.names.get(iid, f'Item {iid}')} Türstatus",
+                base_name=coord.names.get(iid, f"Item {iid}"),
             )
-        )
-    async_add_entities(entities)
+            for iid in item_ids
+        ]
+
+    async_add_entities(_door_sensors(coord.ids))
+
+    # Später erkannte Items ohne Reload ergänzen
+    @callback
+    def _async_add_items(item_ids: List[int]) -> None:
+        async_add_entities(_door_sensors(item_ids))
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_ITEMS_ADDED.format(entry_id=entry.entry_id), _async_add_items)
+    )
 
 class BernerBoxDoorBinarySensor(CoordinatorEntity[BernerBoxCoordinator], BinarySensorEntity):
     """device_class garage_door/door → zeigt „geöffnet/geschlossen“ lokalisiert; hält letzten guten Zustand."""
 
     _attr_should_poll = False
+    # Rohwerte nicht in die Recorder-Attribute übernehmen
+    _unrecorded_attributes = frozenset({"raw_source", "id_item_type_status"})
 
     def __init__(self, *, coordinator: BernerBoxCoordinator, entry_id: str, item_id: int, display_name: str, base_name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=int(item_id))
         self._entry_id = entry_id
         self._item_id = int(item_id)
         self._attr_name = display_name
@@ -52,58 +63,46 @@ class BernerBoxDoorBinarySensor(CoordinatorEntity[BernerBoxCoordinator], BinaryS
             model="BERNER-BOX",
         )
         # Device-Class anhand des Item-Typs
-        item_type = (self._entry or {}).get("id_item_type")
-        self._attr_device_class = "garage_door" if str(item_type) in GARAGE_ITEM_TYPES else "door"
+        item = self._entry
+        self._attr_device_class = "garage_door" if item is not None and item.item_type in GARAGE_ITEM_TYPES else "door"
         self._last_is_on: Optional[bool] = None
         self._attr_extra_state_attributes = {
             "reachable": None,
             "matchcode_item_type_status": None,
             "id_item_type_status": None,
-            "timestamp_executed": None,
             "raw_source": "getItemsByUser (coordinated)",
         }
 
     @property
-    def _entry(self) -> Optional[Dict[str, Any]]:
-        return self.coordinator.data.get(str(self._item_id)) if isinstance(self.coordinator.data, dict) else None
-
-    def _derive_is_on(self, entry: Dict[str, Any]) -> Optional[bool]:
-        mc = entry.get("matchcode_item_type_status")
-        if isinstance(mc, str):
-            st = STATUS_MAP.get(mc)
-            if not st:
-                mcl = mc.lower()
-                for key, val in TEXT_FALLBACK.items():
-                    if key in mcl:
-                        st = val
-                        break
-            if st == "open":
-                return True
-            if st == "closed":
-                return False
-            return None
-        raw_id = entry.get("id_item_type_status")
-        if raw_id is not None:
-            st = NUM_STATUS_MAP.get(str(raw_id))
-            if st == "open":
-                return True
-            if st == "closed":
-                return False
+    def _entry(self) -> Optional[ItemState]:
+        return self.coordinator.data.get(self._item_id) if isinstance(self.coordinator.data, dict) else None
+
+    @staticmethod
+    def _derive_is_on(entry: ItemState) -> Optional[bool]:
+        if entry.state == "open":
+            return True
+        if entry.state == "closed":
+            return False
         return None
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Startzustand setzen – spätere Updates kommen nur noch bei Änderung des Items
+        self._handle_coordinator_update()
+
     def _handle_coordinator_update(self) -> None:
         entry = self._entry
-        if isinstance(entry, dict):
+        if entry is not None:
+            # nur stabile Werte; timestamp_executed (ändert sich bei jedem updateAll) steht in der Diagnose
             self._attr_extra_state_attributes.update({
                 "reachable": True,
-                "matchcode_item_type_status": entry.get("matchcode_item_type_status"),
-                "id_item_type_status": entry.get("id_item_type_status"),
-                "timestamp_executed": entry.get("timestamp_executed"),
+                "matchcode_item_type_status": entry.matchcode_status,
+                "id_item_type_status": entry.id_status,
             })
             # Device-Class ggf. einmalig nachziehen
-            it = entry.get("id_item_type")
+            it = entry.item_type
             if not self.device_class and it is not None:
-                self._attr_device_class = "garage_door" if str(it) in GARAGE_ITEM_TYPES else "door"
+                self._attr_device_class = "garage_door" if it in GARAGE_ITEM_TYPES else "door"
 
             new_is_on = self._derive_is_on(entry)
             if new_is_on is not None:
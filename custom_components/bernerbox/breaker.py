@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+from time import monotonic, time
+from typing import Any, Dict
+
+from .const import BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_BACKOFF, BREAKER_MAX_BACKOFF
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class BernerBoxCircuitBreaker:
+    """
+    Schutzschalter pro Box:
+    - nach `threshold` Verbindungsfehlern in Folge → offen: Requests schlagen sofort fehl (kein Timeout-Warten)
+    - nach Ablauf der Wartezeit genau eine eigene, günstige Probe (half_open) – keine Nutz-Requests
+      (Liste, Impulse, Einstellungen) im Probe-Slot
+    - Probe erfolgreich → geschlossen; Probe fehlgeschlagen → wieder offen mit doppelter Wartezeit
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_backoff: float = BREAKER_BASE_BACKOFF,
+        max_backoff: float = BREAKER_MAX_BACKOFF,
+    ) -> None:
+        self.threshold = max(1, int(threshold))
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = float(max_backoff)
+        self.state: str = STATE_CLOSED
+        self.failures: int = 0
+        self.backoff: float = self.base_backoff
+        self.trips: int = 0
+        self.short_circuited: int = 0
+        self.opened_at: float | None = None        # epoch, für Diagnose
+        self._next_probe: float = 0.0              # monotonic
+
+    @property
+    def is_open(self) -> bool:
+        """Offen oder Probe läuft – die Box gilt als nicht erreichbar."""
+        return self.state != STATE_CLOSED
+
+    def next_probe_in(self) -> float:
+        """Sekunden bis zur nächsten Probe (0 = jetzt)."""
+        if self.state == STATE_CLOSED:
+            return 0.0
+        return max(0.0, self._next_probe - monotonic())
+
+    def allow_request(self) -> bool:
+        """Darf jetzt ein Nutz-Request raus? Nur im geschlossenen Zustand."""
+        if self.state == STATE_CLOSED:
+            return True
+        self.short_circuited += 1
+        return False
+
+    def probe_due(self) -> bool:
+        """Ist die Probe fällig? Dann half_open – der Aufrufer sendet genau eine Probe."""
+        if self.state == STATE_CLOSED:
+            return False
+        now = monotonic()
+        if now < self._next_probe:
+            return False
+        # auch eine hängengebliebene Probe (abgebrochen, ohne Ergebnis) wird so nach `backoff` ersetzt
+        self.state = STATE_HALF_OPEN
+        self._next_probe = now + self.backoff
+        _LOGGER.debug("BernerBox breaker: probing after %.0fs backoff", self.backoff)
+        return True
+
+    def record_success(self) -> None:
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("BernerBox: Box wieder erreichbar (nach %d Fehlversuchen)", self.failures)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.backoff = self.base_backoff
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN:
+            # Probe fehlgeschlagen → länger warten
+            self.backoff = min(self.max_backoff, self.backoff * 2)
+            self._open()
+        elif self.state == STATE_CLOSED and self.failures >= self.threshold:
+            self.trips += 1
+            _LOGGER.warning("BernerBox: Box nach %d Fehlern nicht erreichbar, nächste Probe in %.0fs", self.failures, self.backoff)
+            self.opened_at = time()
+            self._open()
+
+    def _open(self) -> None:
+        self.state = STATE_OPEN
+        self._next_probe = monotonic() + self.backoff
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+            "backoff": self.backoff,
+            "opened_at": self.opened_at,
+            "next_probe_in": round(self.next_probe_in(), 1),
+        }
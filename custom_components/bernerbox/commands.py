@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant
+
+from .api import BernerBoxApiClient, CommandResult
+from .const import IMPULSE_DEBOUNCE, COMMAND_SPACING
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _QueuedCommand:
+    item_id: int
+    func_id: int
+    enqueued: float                             # monotonic
+    future: asyncio.Future = field(repr=False)
+
+
+class BernerBoxCommandQueue:
+    """
+    Serialisiert Funk-Impulse einer Box:
+    - doppelte Impulse für dasselbe Item innerhalb von `debounce` Sekunden werden verworfen
+      (zwei Impulse hintereinander heben sich beim Tor gegenseitig auf)
+    - zwischen zwei Aussendungen liegen mindestens `spacing` Sekunden (keine Kollision auf Funk)
+    - Queue-Tiefe und Wartezeiten werden mitgezählt
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: BernerBoxApiClient,
+        *,
+        debounce: float = IMPULSE_DEBOUNCE,
+        spacing: float = COMMAND_SPACING,
+    ) -> None:
+        self._hass = hass
+        self._api = api
+        self.debounce = float(debounce)
+        self.spacing = float(spacing)
+        self._queue: asyncio.Queue[_QueuedCommand] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+        self._last_accepted: Dict[int, float] = {}
+        self._last_sent: float = 0.0
+
+        # Statistik
+        self.sent: int = 0
+        self.failed: int = 0
+        self.dropped: int = 0
+        self.last_wait: float = 0.0
+        self.max_wait: float = 0.0
+        self._total_wait: float = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        done = self.sent + self.failed
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "last_wait": round(self.last_wait, 3),
+            "max_wait": round(self.max_wait, 3),
+            "avg_wait": round(self._total_wait / done, 3) if done else 0.0,
+        }
+
+    async def async_send_impulse(self, item_id: int, func_id: int) -> Optional[CommandResult]:
+        """Impuls einreihen und auf die Quittung warten. None = als Doppel-Impuls verworfen."""
+        iid = int(item_id)
+        now = monotonic()
+        last = self._last_accepted.get(iid)
+        if last is not None and now - last < self.debounce:
+            self.dropped += 1
+            _LOGGER.debug("BernerBox: Impuls für Item %s verworfen (%.1fs nach dem letzten)", iid, now - last)
+            return None
+        self._last_accepted[iid] = now
+
+        cmd = _QueuedCommand(iid, int(func_id), now, self._hass.loop.create_future())
+        self._queue.put_nowait(cmd)
+        if self._worker is None or self._worker.done():
+            self._worker = self._hass.async_create_background_task(self._run(), f"bernerbox command queue {self._api.host}")
+        return await cmd.future
+
+    async def _run(self) -> None:
+        """Arbeitet die Queue ab und endet, sobald sie leer ist (nächster Impuls startet einen neuen Worker)."""
+        while not self._queue.empty():
+            cmd = self._queue.get_nowait()
+            try:
+                # Mindestabstand zwischen Funkbefehlen
+                gap = self._last_sent + self.spacing - monotonic()
+                if gap > 0:
+                    await asyncio.sleep(gap)
+
+                wait = monotonic() - cmd.enqueued
+                result = await self._api.execute_item_function(cmd.item_id, cmd.func_id)
+                self._last_sent = monotonic()
+
+                self.last_wait = wait
+                self.max_wait = max(self.max_wait, wait)
+                self._total_wait += wait
+                if result.ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                    # fehlgeschlagen → sofortige Wiederholung nicht als Doppel-Impuls verwerfen
+                    self._last_accepted.pop(cmd.item_id, None)
+                _LOGGER.debug(
+                    "BernerBox: Impuls item=%s func=%s %s (wait %.2fs, depth %d)",
+                    cmd.item_id, cmd.func_id, result, wait, self.depth,
+                )
+                if not cmd.future.done():
+                    cmd.future.set_result(result)
+            except asyncio.CancelledError:
+                if not cmd.future.done():
+                    cmd.future.set_result(CommandResult(ok=False, error_code="cancelled"))
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not cmd.future.done():
+                    cmd.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def async_stop(self) -> None:
+        """Worker beenden; noch wartende Befehle schlagen fehl."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while not self._queue.empty():
+            cmd = self._queue.get_nowait()
+            if not cmd.future.done():
+                cmd.future.set_result(CommandResult(ok=False, error_code="cancelled"))
+            self._queue.task_done()
@@ -4,10 +4,39 @@ from typing import Tuple, List, Dict, Any
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from . import DOMAIN
+from .api import BernerBoxApiClient
+from .const import (
+    DOMAIN,
+    CONF_FAST_INTERVAL,
+    CONF_IDLE_INTERVAL,
+    CONF_IMPULSE_DEBOUNCE,
+    CONF_REFRESH_PROFILE,
+    CONF_REQUEST_TIMEOUT,
+    CONF_SAFETY_INTERVAL,
+    CONF_SETTLE_DELAY,
+    DEFAULT_PROFILE,
+    IMPULSE_DEBOUNCE,
+    PROFILE_CUSTOM,
+    REFRESH_PROFILES,
+    REQUEST_TIMEOUT,
+)
+
+
+def resolve_options(entry: config_entries.ConfigEntry) -> Dict[str, Any]:
+    """Wirksame Einstellungen: Profil-Voreinstellung < entry.data < entry.options."""
+    merged = {**entry.data, **entry.options}
+    profile = merged.get(CONF_REFRESH_PROFILE, DEFAULT_PROFILE)
+    preset = REFRESH_PROFILES.get(profile, REFRESH_PROFILES[DEFAULT_PROFILE])
+    return {
+        CONF_REFRESH_PROFILE: profile,
+        CONF_REQUEST_TIMEOUT: float(merged.get(CONF_REQUEST_TIMEOUT, REQUEST_TIMEOUT)),
+        CONF_IMPULSE_DEBOUNCE: float(merged.get(CONF_IMPULSE_DEBOUNCE, IMPULSE_DEBOUNCE)),
+        **{key: float(merged.get(key, default)) for key, default in preset.items()},
+    }
 
 
 def _normalize_host(raw: str) -> str:
@@ -29,6 +58,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         vol.Optional("request_timeout", default=6): int,  # Sekunden
     })
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> "OptionsFlow":
+        return OptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None) -> FlowResult:
         errors: Dict[str, str] = {}
 
@@ -99,21 +133,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         info kann Liste oder Objekt sein. Wir extrahieren api_key und id (user_id).
         Rückgabe: (api_key, user_id, error)
         """
-        session = async_get_clientsession(self.hass)
-        url = f"{host}/api/v1/User/authUser"
-        payload = {"username": username, "password": password, "uuid": ""}
-
-        try:
-            async with session.post(url, data=payload, timeout=timeout, headers={"Accept": "application/json"}) as resp:
-                text = await resp.text()
-                if resp.status != 200:
-                    return None, None, f"http_{resp.status}"
-                try:
-                    j = await resp.json(content_type=None)
-                except Exception:
-                    return None, None, "invalid_json"
-        except Exception:
-            return None, None, "cannot_connect"
+        api = BernerBoxApiClient(self.hass, host=host, timeout=timeout, session=async_get_clientsession(self.hass))
+        j, err = await api.auth_user(username, password)
+        if err:
+            return None, None, err
 
         if not isinstance(j, dict) or j.get("status") != "OK":
             return None, None, "invalid_auth"
@@ -150,19 +173,13 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         GET /api/item/getItemsByUser.json/{user_id}?api_key=KEY -> Liste von Items.
         Wir extrahieren alle id_item als ints, deduplizieren und sortieren.
         """
-        session = async_get_clientsession(self.hass)
-        url = f"{host}/api/item/getItemsByUser.json/{user_id}?api_key={api_key}"
-        try:
-            async with session.get(url, timeout=timeout, headers={"Accept": "application/json"}) as resp:
-                text = await resp.text()
-                if resp.status != 200:
-                    return [], "http_error"
-                try:
-                    data = await resp.json(content_type=None)
-                except Exception:
-                    return [], "invalid_json"
-        except Exception:
-            return [], "cannot_connect"
+        api = BernerBoxApiClient(
+            self.hass, host=host, api_key=api_key, user_id=user_id, timeout=timeout,
+            session=async_get_clientsession(self.hass),
+        )
+        data, err = await api.fetch_items_checked()
+        if err:
+            return [], err
 
         if not isinstance(data, list):
             return [], "invalid_json"
@@ -178,3 +195,62 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         # dedupe + sort
         ids = sorted(set(ids))
         return ids, None
+
+
+class OptionsFlow(config_entries.OptionsFlow):
+    """
+    Laufzeit-Optionen je Box; werden über den Update-Listener live übernommen (kein Reload):
+    1) Profil (standard/busy/quiet/custom) + Request-Timeout + Doppel-Impuls-Sperre
+    2) nur bei „custom“: Intervalle einzeln
+    """
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self._entry = config_entry
+        self._options: Dict[str, Any] = {}
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        current = resolve_options(self._entry)
+        if user_input is not None:
+            self._options = dict(user_input)
+            profile = user_input[CONF_REFRESH_PROFILE]
+            if profile == PROFILE_CUSTOM:
+                return await self.async_step_custom()
+            return self.async_create_entry(title="", data={**self._options, **REFRESH_PROFILES[profile]})
+
+        schema = vol.Schema({
+            vol.Required(CONF_REFRESH_PROFILE, default=current[CONF_REFRESH_PROFILE]): vol.In(
+                [*REFRESH_PROFILES, PROFILE_CUSTOM]
+            ),
+            vol.Required(CONF_REQUEST_TIMEOUT, default=current[CONF_REQUEST_TIMEOUT]): vol.All(
+                vol.Coerce(float), vol.Range(min=1, max=60)
+            ),
+            vol.Required(CONF_IMPULSE_DEBOUNCE, default=current[CONF_IMPULSE_DEBOUNCE]): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=30)
+            ),
+        })
+        return self.async_show_form(step_id="init", data_schema=schema)
+
+    async def async_step_custom(self, user_input=None) -> FlowResult:
+        errors: Dict[str, str] = {}
+        current = resolve_options(self._entry)
+        if user_input is not None and CONF_FAST_INTERVAL in user_input:
+            if user_input[CONF_IDLE_INTERVAL] < user_input[CONF_FAST_INTERVAL]:
+                errors["base"] = "idle_below_fast"
+            else:
+                return self.async_create_entry(title="", data={**self._options, **user_input})
+
+        schema = vol.Schema({
+            vol.Required(CONF_FAST_INTERVAL, default=current[CONF_FAST_INTERVAL]): vol.All(
+                vol.Coerce(float), vol.Range(min=1, max=60)
+            ),
+            vol.Required(CONF_IDLE_INTERVAL, default=current[CONF_IDLE_INTERVAL]): vol.All(
+                vol.Coerce(float), vol.Range(min=5, max=3600)
+            ),
+            vol.Required(CONF_SAFETY_INTERVAL, default=current[CONF_SAFETY_INTERVAL]): vol.All(
+                vol.Coerce(float), vol.Range(min=30, max=86400)
+            ),
+            vol.Required(CONF_SETTLE_DELAY, default=current[CONF_SETTLE_DELAY]): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=60)
+            ),
+        })
+        return self.async_show_form(step_id="custom", data_schema=schema, errors=errors)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+DOMAIN = "bernerbox"
+
+# HTTP: kleiner Pool pro Box (eingebetteter Webserver verträgt wenig Parallelität)
+BOX_MAX_CONNECTIONS = 2
+BOX_KEEPALIVE_TIMEOUT = 30             # Sekunden, Verbindung warm halten
+
+# Domain-weite Staffelung vieler Boxen
+FLEET_DATA_KEY = f"{DOMAIN}_fleet"
+FLEET_MAX_CONCURRENT = 4               # gleichzeitige Requests über alle Boxen
+FLEET_JITTER = 0.25                    # Jitter als Anteil der Slot-Breite
+
+# 🔁 App-ähnliches Verhalten:
+# Adaptives Polling: schnell solange sich etwas bewegt, danach schrittweise zurück
+CONF_FAST_INTERVAL = "fast_interval"
+CONF_IDLE_INTERVAL = "idle_interval"
+FAST_INTERVAL = 2                      # Sekunden, solange ein Tor fährt / nach Impuls
+IDLE_INTERVAL = 120                    # Sekunden, wenn alles ruht
+BACKOFF_FACTOR = 2                     # 2s → 4s → 8s … bis IDLE_INTERVAL
+IMPULSE_FAST_WINDOW = 30               # nach Impuls mind. so lange schnell pollen
+UPDATEALL_SAFETY_INTERVAL = 300        # zusätzlicher Refresh alle 5 Minuten
+UPDATEALL_COALESCE = 2.0               # geplante updateAll-Termine näher als x s zusammenlegen
+ITEM_POLL_SECONDS = 2.0                # Box pollt intern je Item ~2s nach updateAll
+UPDATEALL_TIMEOUT = 30                 # Sekunden, Obergrenze für den updateAll-Request
+
+# Schutzschalter bei nicht erreichbarer Box
+BREAKER_FAILURE_THRESHOLD = 3          # Verbindungsfehler in Folge bis „offen“
+BREAKER_BASE_BACKOFF = 10              # Sekunden bis zur ersten Probe
+BREAKER_MAX_BACKOFF = 600              # Obergrenze der exponentiell wachsenden Wartezeit
+
+# Optionen (live anwendbar, ohne Reload)
+CONF_REQUEST_TIMEOUT = "request_timeout"
+REQUEST_TIMEOUT = 6                    # Sekunden je Request (keine Untergrenze mehr)
+CONF_SAFETY_INTERVAL = "safety_interval"
+CONF_SETTLE_DELAY = "settle_delay"
+CONF_REFRESH_PROFILE = "refresh_profile"
+PROFILE_CUSTOM = "custom"
+DEFAULT_PROFILE = "standard"
+# Voreinstellungen je Einsatz: viel befahrenes Tor ↔ selten genutzter Schuppen
+REFRESH_PROFILES = {
+    "standard": {"fast_interval": 2, "idle_interval": 120, "safety_interval": 300, "settle_delay": 3},
+    "busy": {"fast_interval": 2, "idle_interval": 30, "safety_interval": 120, "settle_delay": 3},
+    "quiet": {"fast_interval": 3, "idle_interval": 600, "safety_interval": 1800, "settle_delay": 5},
+}
+
+# Impuls-Bestätigung (geschlossener Regelkreis statt fester +5s/+25s)
+PENDING_DEADLINE = 90                  # spätestens dann aufgeben (Sekunden)
+PENDING_FIRST_UPDATEALL = 3            # erstes updateAll frühestens x s nach Impuls
+PENDING_UPDATEALL_INTERVAL = 5         # danach höchstens alle x s ein updateAll
+SETTLED_STATES = ("open", "closed", "error")
+
+# Cover: optimistisches öffnet/schließt direkt nach dem Impuls
+COVER_OPTIMISTIC_TIMEOUT = 60          # Sekunden ohne Bestätigung → Anzeige zurücknehmen
+
+# Gelernte Fahrzeit je Tor (steuert die Nachfrage-Zeitpunkte nach einem Impuls)
+TRAVEL_WINDOW = 10                     # letzte x bestätigte Impulse je Item
+TRAVEL_MIN_SAMPLES = 3                 # erst ab so vielen Messungen das Modell verwenden
+
+# Box-Einstellungen (getAllSettings): langsame Spur, gecacht
+SETTINGS_TTL = 3600                    # Sekunden bis zum nächsten getAllSettings
+
+# Services
+SERVICE_EXECUTE_ITEMS = "execute_items"
+
+# Befehls-Queue je Box (Funk-Impulse)
+CONF_IMPULSE_DEBOUNCE = "impulse_debounce"
+IMPULSE_DEBOUNCE = 3.0                 # Doppel-Impuls für dasselbe Item innerhalb x s verwerfen
+COMMAND_SPACING = 1.0                  # Mindestabstand zwischen zwei Funkbefehlen (s)
+
+# Inkrementelle Erkennung von Items (ohne Reload)
+SIGNAL_ITEMS_ADDED = f"{DOMAIN}_items_added_{{entry_id}}"
+DISCOVERY_REMOVE_AFTER = 600           # Sekunden, die ein Item fehlen muss, bevor es entfernt wird
+DISCOVERY_MIN_POLLS = 5                # ... und in so vielen erfolgreichen Listen in Folge
+DISCOVERY_MAX_MISSING_SHARE = 0.5      # fehlt mehr als dieser Anteil auf einmal: Box-Problem, nichts entfernen
+
+# Persistenter Cache (Items, Namen, letzte Zustände) je Entry
+STORAGE_VERSION = 1
+STORAGE_KEY = "bernerbox.{entry_id}"
+CACHE_SAVE_DELAY = 30                  # Sekunden, Schreibzugriffe bündeln
+
+# Box-Sensor „Letzte Aktualisierung“: höchstens alle x s neu schreiben (Recorder)
+LAST_SEEN_THROTTLE = 300
+
+# Laufzeit-Metriken je Endpunkt (Diagnose)
+METRICS_WINDOW = 200                   # letzte x Latenzen je Endpunkt für p50/p95
+TRACE_SIZE = 100                       # letzte x API-Aufrufe je Box im Ringpuffer
+
+# Mappings für Statusableitung
+STATUS_MAP = {
+    "item_type_status_zu": "closed",
+    "item_type_status_auf": "open",
+    "item_type_status_in_bewegung": "moving",
+    "item_type_status_fehlfunktion": "error",
+}
+NUM_STATUS_MAP = {"1": "open", "2": "closed", "3": "moving", "4": "error"}
+TEXT_FALLBACK = {"zu": "closed", "auf": "open", "beweg": "moving", "error": "error", "fehler": "error"}
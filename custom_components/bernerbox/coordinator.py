@@ -1,91 +1,846 @@
 from __future__ import annotations
+
+from asyncio import Task, TimerHandle
+from dataclasses import asdict, dataclass
 from datetime import timedelta
-import asyncio
+from functools import lru_cache
+from hashlib import blake2b
+import heapq
 import logging
-from typing import Dict, Any, Optional, List
+from time import time, monotonic
+from typing import Dict, Any, Optional, List, Set
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util.json import json_loads
 
-from . import DOMAIN
+from .api import BernerBoxApiClient, NOT_MODIFIED
+from .scheduler import BernerBoxFleetScheduler
+from .travel import TravelTimeModel
+from .const import (
+    DOMAIN,
+    FAST_INTERVAL,
+    IDLE_INTERVAL,
+    BACKOFF_FACTOR,
+    IMPULSE_FAST_WINDOW,
+    UPDATEALL_SAFETY_INTERVAL,
+    UPDATEALL_COALESCE,
+    ITEM_POLL_SECONDS,
+    PENDING_DEADLINE,
+    PENDING_FIRST_UPDATEALL,
+    PENDING_UPDATEALL_INTERVAL,
+    SETTLED_STATES,
+    STATUS_MAP,
+    NUM_STATUS_MAP,
+    TEXT_FALLBACK,
+    STORAGE_VERSION,
+    STORAGE_KEY,
+    CACHE_SAVE_DELAY,
+    SETTINGS_TTL,
+    SIGNAL_ITEMS_ADDED,
+    DISCOVERY_REMOVE_AFTER,
+    DISCOVERY_MIN_POLLS,
+    DISCOVERY_MAX_MISSING_SHARE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-# Ein gemeinsamer Poll alle X Sekunden (kannst du erhöhen, z.B. 10–15s)
-SCAN_INTERVAL = timedelta(seconds=5)
-
-async def _get_json(session, url: str, timeout: int) -> Optional[Any]:
-    try:
-        async with session.get(url, timeout=timeout, headers={"Accept": "application/json"}) as resp:
-            if resp.status != 200:
-                txt = await resp.text()
-                _LOGGER.debug("GET %s -> %s %s", url, resp.status, txt[:200])
-                return None
-            return await resp.json(content_type=None)
-    except Exception as e:
-        _LOGGER.debug("GET fail %s (%s)", url, e)
-        return None
-
-class BernerBoxCoordinator(DataUpdateCoordinator[Dict[str, Dict[str, Any]]]):
-    """Ein Request-Paar pro Zyklus für alle Items (updateAllItemsByUser + getItemsByUser)."""
-
-    def __init__(self, hass: HomeAssistant, *, host: str, api_key: str, user_id: int, timeout: int, ids: List[int]) -> None:
-        super().__init__(hass, _LOGGER, name=f"BernerBox@{host}", update_interval=SCAN_INTERVAL)
-        self._host = host.rstrip("/")
-        self._api_key = api_key
-        self._user_id = user_id
-        self._timeout = timeout
-        self._ids = [int(i) for i in ids]
-        self._session = async_get_clientsession(hass)
-        self.names: Dict[int, str] = {}  # stabile Namen (einmalig befüllt)
-
-    async def _async_update_data(self) -> Dict[str, Dict[str, Any]]:
-        # 1) globales Refresh anstoßen
-        await _get_json(self._session, f"{self._host}/api/item/updateAllItemsByUser.json/{self._user_id}?api_key={self._api_key}", self._timeout)
-
-        # 2) kleine Pause (Box pollt intern je Item ~2s)
-        await asyncio.sleep(2)
-
-        # 3) Liste für alle Items holen
-        data = await _get_json(self._session, f"{self._host}/api/item/getItemsByUser.json/{self._user_id}?api_key={self._api_key}", self._timeout)
-        if not isinstance(data, list):
-            raise UpdateFailed("getItemsByUser returned no list")
-
-        # stabile Namen einmalig setzen
-        if not self.names:
-            for it in data:
-                try:
-                    iid = int(it.get("id_item"))
-                    nm = (it.get("name") or f"Item {iid}").strip()
-                    self.names[iid] = nm
-                except Exception:
-                    continue
-            for iid in self._ids:
-                self.names.setdefault(iid, f"Item {iid}")
-
-        # nur konfigurierte IDs in ein Dict legen
-        by_id: Dict[str, Dict[str, Any]] = {}
+
+@lru_cache(maxsize=128)
+def state_from_status(matchcode: Optional[str], raw_id: Optional[str]) -> Optional[str]:
+    """open/closed/moving/error aus matchcode bzw. numerischer Status-ID (memoisiert)."""
+    if isinstance(matchcode, str):
+        st = STATUS_MAP.get(matchcode)
+        if st:
+            return st
+        mcl = matchcode.lower()
+        for key, val in TEXT_FALLBACK.items():
+            if key in mcl:
+                return val
+    if raw_id is not None:
+        return NUM_STATUS_MAP.get(raw_id)
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class ItemState:
+    """Kompakter, einmal pro Zyklus geparster Zustand eines Items (nur genutzte Felder)."""
+
+    item_id: int
+    name: str
+    item_type: Optional[str]
+    matchcode_status: Optional[str]
+    matchcode_torlage: Optional[str]
+    matchcode_error: Optional[str]
+    id_status: Any
+    id_torlage: Any
+    id_error: Any
+    timestamp_executed: Any
+    state: Optional[str]            # open/closed/moving/error oder None
+
+    @classmethod
+    def from_raw(cls, item_id: int, it: Dict[str, Any]) -> "ItemState":
+        mc = it.get("matchcode_item_type_status")
+        raw_id = it.get("id_item_type_status")
+        item_type = it.get("id_item_type")
+        return cls(
+            item_id=item_id,
+            name=(it.get("name") or f"Item {item_id}").strip(),
+            item_type=str(item_type) if item_type is not None else None,
+            matchcode_status=mc,
+            matchcode_torlage=it.get("matchcode_item_type_torlage"),
+            matchcode_error=it.get("matchcode_item_type_error"),
+            id_status=raw_id,
+            id_torlage=it.get("id_item_type_torlage"),
+            id_error=it.get("id_item_type_error"),
+            timestamp_executed=it.get("timestamp_executed"),
+            state=state_from_status(mc if isinstance(mc, str) else None, str(raw_id) if raw_id is not None else None),
+        )
+
+
+@dataclass
+class PendingTransition:
+    """Ein ausgelöster Impuls, dessen Ergebnis noch nicht von der Box bestätigt ist."""
+
+    item_id: int
+    started: float                  # monotonic
+    deadline: float                 # monotonic
+    from_state: Optional[str]
+    from_matchcode: Optional[str]
+    from_timestamp: Any
+    seen_moving: bool = False
+    resume_at: float = 0.0          # Sekunden nach Impuls: ab hier regelmäßige updateAll-Nachfrage
+    prev_probe: float | None = None # monotonic: vorletztes updateAll seit Impuls
+    last_probe: float | None = None # monotonic: letztes updateAll seit Impuls
+    last_checked: float | None = None  # monotonic: letzte Liste ohne Bestätigung
+    last_old_read: float | None = None # monotonic: Box-Lesen hinter dieser Liste (Tor noch nicht angekommen)
+    quiet_until: float = 0.0        # monotonic: gelernte Fahrzeit – bis hierhin kein schnelles Listen-Polling
+    repoll: float = ITEM_POLL_SECONDS  # Sekunden nach updateAll, bis die Box dieses Item neu abgefragt hat
+    probe_timestamp: Any = None     # timestamp_executed beim letzten updateAll (weitergezählt = Box hat gelesen)
+
+
+@dataclass
+class TransitionResult:
+    """Ergebnis eines Impulses: bestätigter Zustand (oder Timeout) und Dauer."""
+
+    item_id: int
+    state: Optional[str]
+    confirmed: bool
+    duration: float                 # Sekunden seit Impuls
+    finished_at: float              # epoch
+
+
+class BernerBoxCoordinator(DataUpdateCoordinator[Dict[int, ItemState]]):
+    """
+    Einziger Poller pro Box (eine Instanz pro Config-Entry, von allen Plattformen geteilt):
+    - getItemsByUser: adaptiv (schnell während Bewegung/nach Impuls, dann Backoff bis Idle-Intervall)
+    - updateAllItemsByUser: solange ein Impuls unbestätigt ist + planbar + Sicherheitslauf alle 5min
+    - einzelne Fehler: alte Daten bleiben erhalten; erst bei offenem Schutzschalter UpdateFailed (unavailable)
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        *,
+        entry_id: str,
+        api: BernerBoxApiClient,
+        ids: List[int],
+        fleet: BernerBoxFleetScheduler | None = None,
+        fast_interval: float = FAST_INTERVAL,
+        idle_interval: float = IDLE_INTERVAL,
+        timeout: float | None = None,
+        safety_interval: float = UPDATEALL_SAFETY_INTERVAL,
+        settle_delay: float = PENDING_FIRST_UPDATEALL,
+    ) -> None:
+        self.fast_interval = max(1.0, float(fast_interval))
+        self.idle_interval = max(self.fast_interval, float(idle_interval))
+        super().__init__(hass, _LOGGER, name=f"BernerBox@{api.host}", update_interval=timedelta(seconds=self.idle_interval))
+        self.api = api
+        self.entry_id = entry_id
+        self._fleet = fleet
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=entry_id))
+        self._timeout = float(timeout) if timeout else api.timeout
+        self.safety_interval = float(safety_interval)
+        self.settle_delay = float(settle_delay)
+        self._ids: Set[int] = {int(i) for i in ids}    # bekannte Items (indiziert, wächst/schrumpft mit der Box)
+
+        # Stabile Namen einmalig merken; werden nie überschrieben
+        self.names: Dict[int, str] = {}
+
+        # Zeitmanagement
+        self.last_seen: float | None = None        # erfolgreiche Liste
+        self._last_updateall: float = 0.0          # letzter Sicherheitslauf
+        if fleet is not None:
+            # erster Sicherheitslauf im eigenen Slot statt bei allen Boxen gleichzeitig nach dem Start
+            self._last_updateall = time()
+        self._last_updateall_mono: float = 0.0     # letztes updateAll überhaupt (monotonic)
+        self._updateall_task: Task | None = None   # laufender updateAll-Request (wird beim Entladen abgebrochen)
+        # Zwei-Phasen-Refresh: Zeitstempel beim updateAll + geplanter Nachlauf
+        self._updateall_baseline: Dict[int, Any] | None = None
+        self._unsub_followup: CALLBACK_TYPE | None = None
+        self._due_updates: List[float] = []        # Min-Heap geplanter updateAll-Zeitpunkte (monotonic)
+        self._updateall_timer: TimerHandle | None = None
+        self._fast_until: float = 0.0              # monotonic: bis hierhin schnell pollen (Impuls)
+        self._interval_s: float = self.idle_interval
+
+        # Impuls-Tracking je Item
+        self.pending: Dict[int, PendingTransition] = {}
+        self.transitions: Dict[int, TransitionResult] = {}
+        self.travel = TravelTimeModel()            # gelernte Fahrzeit je Item (persistiert)
+
+        # Änderungsbewusstes Dispatching: nur Entities geänderter Items wecken
+        self.changed_ids: Set[int] = set()
+        self.suppressed_updates: int = 0
+        self._notified_success: bool = True
+
+        # Zähler (z.B. für Tests): genau ein getItemsByUser pro Zyklus
+        self.update_cycles: int = 0
+        self.list_requests: int = 0
+        self.updateall_requests: int = 0
+        self.last_cycle_duration: float | None = None   # Sekunden, letzter Update-Zyklus
+
+        # Digest der letzten ausgewerteten Liste: gleiche Bytes → Zyklus ohne Decode/Dispatch
+        self._payload_digest: bytes | None = None
+        self.unchanged_payloads: int = 0
+
+        # Inkrementelle Erkennung: neue/verschwundene id_item, Entities per Dispatcher-Signal
+        self._added_ids: Set[int] = set()
+        self._removed_ids: Set[int] = set()
+        self._missing_since: Dict[int, float] = {}    # epoch, seit wann ein Item in der Liste fehlt
+        self._missing_polls: Dict[int, int] = {}      # in wie vielen erfolgreichen Listen es gefehlt hat
+
+    @property
+    def ids(self) -> List[int]:
+        return sorted(self._ids)
+
+    # ——— Planer-API: vom Button nutzbar ———
+    def schedule_updateall(self, delay_s: float) -> None:
+        """updateAll exakt nach `delay_s` Sekunden (Loop-Timer); nahe Termine werden zusammengelegt."""
+        due = monotonic() + max(0.0, float(delay_s))
+        if any(abs(d - due) <= UPDATEALL_COALESCE for d in self._due_updates):
+            _LOGGER.debug("BernerBoxCoordinator: updateAll in %.1fs coalesced with existing slot", delay_s)
+            return
+        heapq.heappush(self._due_updates, due)
+        self._arm_updateall_timer()
+        _LOGGER.debug("BernerBoxCoordinator: scheduled updateAll in %.1fs (queue=%d)", delay_s, len(self._due_updates))
+
+    def _arm_updateall_timer(self) -> None:
+        if self._updateall_timer is not None:
+            self._updateall_timer.cancel()
+            self._updateall_timer = None
+        if self._due_updates:
+            delay = max(0.0, self._due_updates[0] - monotonic())
+            self._updateall_timer = self.hass.loop.call_later(delay, self._handle_due_updateall)
+
+    @callback
+    def _handle_due_updateall(self) -> None:
+        self._updateall_timer = None
+        limit = monotonic() + UPDATEALL_COALESCE
+        fired = False
+        while self._due_updates and self._due_updates[0] <= limit:
+            heapq.heappop(self._due_updates)
+            fired = True
+        if fired:
+            self._start_updateall()
+        self._arm_updateall_timer()
+
+    def _cancel_scheduled_updateall(self) -> None:
+        self._due_updates.clear()
+        self._arm_updateall_timer()
+
+    def _updateall_in_flight(self) -> bool:
+        return self._updateall_task is not None and not self._updateall_task.done()
+
+    def _start_updateall(self) -> bool:
+        """updateAll im Hintergrund anstoßen (nicht abwarten) und Nachlauf-Liste planen.
+
+        Läuft der vorige updateAll-Request noch, wird kein weiterer gestartet (False).
+        """
+        if self._updateall_in_flight():
+            _LOGGER.debug("BernerBoxCoordinator: updateAll still in flight, skipping")
+            return False
+        _LOGGER.debug("BernerBoxCoordinator: calling updateAll (background)")
+        self.updateall_requests += 1
+        name = f"{DOMAIN} updateAll {self.api.host}"
+        entry = self.hass.config_entries.async_get_entry(self.entry_id)
+        if entry is not None:
+            # an den Entry gebunden: Entladen bricht einen noch wartenden Request ab
+            self._updateall_task = entry.async_create_background_task(self.hass, self.api.update_all(), name)
+        else:
+            self._updateall_task = self.hass.async_create_background_task(self.api.update_all(), name)
+        self._last_updateall = time()
+        self._last_updateall_mono = monotonic()
+        # Messfenster offener Impulse: Tor kam zwischen vorletztem und diesem updateAll an
+        for pt in self.pending.values():
+            if pt.last_probe is not None:
+                pt.prev_probe = pt.last_probe
+            pt.last_probe = self._last_updateall_mono
+            item = (self.data or {}).get(pt.item_id)
+            pt.probe_timestamp = item.timestamp_executed if item else None
+        # Kein Warten: aktuelle Liste sofort liefern, Nachlauf wenn die Box fertig sein sollte.
+        # Läuft noch ein Durchlauf, bleiben Baseline und Nachlauf stehen – die Box nimmt den neuen
+        # updateAll evtl. erst danach an, ein neuer Nachlauf würde das Ende nur weiter hinausschieben.
+        if self._updateall_baseline is None:
+            current = self.data or {}
+            self._updateall_baseline = {k: it.timestamp_executed for k, it in current.items()}
+            self._schedule_followup(self._ready_delay(len(current) or len(self._ids)))
+        return True
+
+    def notify_impulse(self) -> None:
+        """Nach einem Impuls sofort auf schnelles Polling umschalten."""
+        self._fast_until = monotonic() + IMPULSE_FAST_WINDOW
+        self._set_interval(self.fast_interval)
+        # laufenden (evtl. langen) Timer neu aufsetzen
+        self.hass.async_create_task(self.async_request_refresh())
+
+    def track_impulse(self, item_id: int) -> None:
+        """Impuls merken und so lange nachfragen, bis die Box einen stabilen Zustand meldet."""
+        self.track_impulses([item_id])
+
+    def track_impulses(self, item_ids: List[int]) -> None:
+        """Mehrere Impulse gemeinsam verfolgen: ein gemeinsamer Nachfrage-Plan statt einem je Tor."""
+        now = monotonic()
+        stats = []
+        sweep = self._ready_delay(len(self.data or {}) or len(self._ids))
+        for item_id in item_ids:
+            iid = int(item_id)
+            item = (self.data or {}).get(iid)
+            st = self.travel.stats(iid)
+            stats.append(st)
+            repoll = self._repoll_delay(iid)
+            self.pending[iid] = PendingTransition(
+                item_id=iid,
+                started=now,
+                # Frist: evtl. laufenden Box-Durchlauf abwarten, dann bis die Box dieses Item erneut liest
+                deadline=now + max(PENDING_DEADLINE, 2 * st.p90 if st else 0) + sweep + repoll,
+                from_state=item.state if item else None,
+                from_matchcode=item.matchcode_status if item else None,
+                from_timestamp=item.timestamp_executed if item else None,
+                resume_at=self.settle_delay,
+                repoll=repoll,
+            )
+            _LOGGER.debug(
+                "BernerBoxCoordinator: tracking impulse item=%s from=%s travel=%s", iid, self.pending[iid].from_state, st
+            )
+        if stats and all(st is not None for st in stats):
+            # Gelernte Fahrzeit: updateAll genau dann, wenn (alle) Tore ankommen sollten (Median, Nachzügler p90);
+            # Liste erst, wenn die Box das Tor danach neu abgefragt haben sollte, regelmäßiges Nachfragen nach p90
+            median_s = max(st.median for st in stats)
+            p90_s = max(st.p90 for st in stats)
+            self.schedule_updateall(median_s)
+            self.schedule_updateall(p90_s)
+            for item_id in item_ids:
+                iid = int(item_id)
+                self.pending[iid].quiet_until = now + median_s + self.pending[iid].repoll
+                self.pending[iid].resume_at = p90_s + PENDING_UPDATEALL_INTERVAL
+            # kein schnelles Polling: nächster Listen-Fetch direkt nach dem erwarteten Box-Poll
+            self._adapt_interval(self.data or {})
+            if self._listeners:
+                self._schedule_refresh()
+            return
+        self.notify_impulse()
+
+    def _check_pending(self, by_id: Dict[int, ItemState]) -> None:
+        """Offene Impulse gegen die neue Liste prüfen (bestätigt / Timeout)."""
+        if not self.pending:
+            return
+        now = monotonic()
+        for iid, pt in list(self.pending.items()):
+            item = by_id.get(iid)
+            state = item.state if item else None
+            if state == "moving":
+                pt.seen_moving = True
+            confirmed = False
+            if item and state in SETTLED_STATES:
+                mc_changed = item.matchcode_status != pt.from_matchcode
+                ts_changed = item.timestamp_executed != pt.from_timestamp
+                if mc_changed and state != pt.from_state:
+                    confirmed = True
+                elif pt.seen_moving:
+                    confirmed = True
+                elif ts_changed and pt.from_state not in SETTLED_STATES:
+                    confirmed = True
+            if confirmed:
+                self._learn_travel(pt, now)
+            elif now < pt.deadline:
+                pt.last_checked = now
+                pt.last_old_read = self._item_read_at(pt, now)
+            if confirmed or now >= pt.deadline:
+                result = TransitionResult(
+                    item_id=iid,
+                    state=state,
+                    confirmed=confirmed,
+                    duration=round(now - pt.started, 1),
+                    finished_at=time(),
+                )
+                self.transitions[iid] = result
+                self.changed_ids.add(iid)
+                del self.pending[iid]
+                if confirmed:
+                    _LOGGER.debug("BernerBoxCoordinator: item=%s confirmed %s after %.1fs", iid, state, result.duration)
+                else:
+                    _LOGGER.info("BernerBox: Impuls für Item %s nach %.0fs nicht bestätigt (Status %s)", iid, result.duration, state)
+
+    def _learn_travel(self, pt: PendingTransition, now: float) -> None:
+        """
+        Fahrzeit schätzen: Mitte des Fensters, in dem das Tor angekommen ist.
+        - obere Grenze: Lesen der Box, das die bestätigende Liste zeigt (updateAll + repoll)
+        - untere Grenze: Lesen hinter der letzten Liste, die noch alten/fahrenden Zustand zeigte
+        Ohne solche Liste seit dem Impuls ist nur die obere Grenze bekannt – dann höchstens der
+        bisherige Median (Probe zum Median bestätigt → Modell bleibt, statt auf die Hälfte zu fallen).
+        """
+        upper = self._item_read_at(pt, now)
+        lower = pt.last_old_read
+        if upper <= (lower if lower is not None else pt.started):
+            # Zustand kam nicht über ein eigenes updateAll (z.B. Durchlauf der Box): Listen-Fenster
+            upper, lower = now, pt.last_checked
+        if lower is None or lower <= pt.started:
+            st = self.travel.stats(pt.item_id)
+            sample = upper - pt.started
+            if st is not None:
+                sample = min(sample, st.median)
+        else:
+            sample = (lower + upper) / 2 - pt.started
+        self.travel.add(pt.item_id, sample)
+        self._schedule_cache_save()
+
+    @staticmethod
+    def _item_read_at(pt: PendingTransition, at: float) -> float:
+        """Letztes Lesen des Items durch die Box, das eine Liste zum Zeitpunkt `at` zeigt (Impuls, falls keins)."""
+        for probe in (pt.last_probe, pt.prev_probe):
+            if probe is not None and probe + pt.repoll <= at:
+                return probe + pt.repoll
+        return pt.started
+
+    def _pending_needs_updateall(self, now_mono: float) -> bool:
+        """
+        Offener Impuls → erneut updateAll, aber nie überlappend:
+        - nicht, solange der vorige Request läuft
+        - frühestens, wenn die Box das Item neu abgefragt haben sollte (Position im Durchlauf × ITEM_POLL_SECONDS)
+        - und erst, wenn sie es seit dem letzten updateAll wirklich gelesen hat (timestamp_executed weitergezählt)
+          oder ihr Durchlauf vorbei ist – sonst steckt sie noch im vorigen Durchlauf
+        """
+        if not self.pending or self._updateall_in_flight():
+            return False
+        data = self.data or {}
+        for pt in self.pending.values():
+            if now_mono - pt.started < pt.resume_at:
+                continue
+            if pt.last_probe is None:
+                return True
+            if now_mono - pt.last_probe < max(PENDING_UPDATEALL_INTERVAL, pt.repoll):
+                continue
+            item = data.get(pt.item_id)
+            if self._updateall_baseline is None or (item is not None and item.timestamp_executed != pt.probe_timestamp):
+                return True
+        return False
+
+    def _safety_due(self, now: float) -> bool:
+        """Sicherheits-updateAll fällig: im eigenen Slot des Domain-Schedulers bzw. alle safety_interval."""
+        if self._fleet is not None:
+            return self._fleet.safety_slot_due(self.entry_id, self.safety_interval, self._last_updateall, now)
+        return now - self._last_updateall >= self.safety_interval
+
+    def _ready_delay(self, waiting: int) -> float:
+        """Geschätzte Zeit, bis die Box `waiting` Items nach updateAll neu abgefragt hat."""
+        return max(ITEM_POLL_SECONDS, waiting * ITEM_POLL_SECONDS)
+
+    def _repoll_delay(self, item_id: int) -> float:
+        """Geschätzte Zeit nach updateAll, bis die Box dieses Item liest (Durchlauf in Listenreihenfolge)."""
+        order = list(self.data or {})
+        position = order.index(item_id) + 1 if item_id in order else len(order) or len(self._ids)
+        return self._ready_delay(position)
+
+    def _schedule_followup(self, delay: float) -> None:
+        """Nachlauf-Liste planen (ersetzt einen bereits geplanten)."""
+        self._cancel_followup()
+        self._unsub_followup = async_call_later(self.hass, delay, self._handle_followup)
+        _LOGGER.debug("BernerBoxCoordinator: follow-up list fetch in %.1fs", delay)
+
+    def _cancel_followup(self) -> None:
+        if self._unsub_followup is not None:
+            self._unsub_followup()
+            self._unsub_followup = None
+
+    @callback
+    def _handle_followup(self, _now) -> None:
+        self._unsub_followup = None
+        # Durchlauf gilt spätestens jetzt als beendet – auch wenn ein Item (z.B. Funk gestört) nie weiterzählt
+        self._updateall_baseline = None
+        self.hass.async_create_task(self.async_refresh())
+
+    def _check_updateall_progress(self, by_id: Dict[int, ItemState]) -> None:
+        """Nach updateAll: sind alle timestamp_executed weitergelaufen, ist die Box fertig."""
+        base = self._updateall_baseline
+        if base is None:
+            return
+        waiting = [k for k, it in by_id.items() if k in base and it.timestamp_executed == base[k]]
+        if not waiting:
+            _LOGGER.debug("BernerBoxCoordinator: updateAll finished (all timestamps moved)")
+            self._updateall_baseline = None
+            self._cancel_followup()
+        elif len(waiting) < len(base) and self._unsub_followup is not None:
+            # teilweise fertig → Nachlauf auf die Rest-Items verkürzen
+            self._schedule_followup(self._ready_delay(len(waiting)))
+
+    # ——— Persistenter Cache: Entities sofort anlegen, auch wenn die Box offline ist ———
+    async def async_load_cache(self) -> bool:
+        """Letzte bekannte Items/Namen laden und als Startdaten setzen. True, wenn Cache vorhanden."""
+        try:
+            stored = await self._store.async_load()
+        except Exception as e:
+            _LOGGER.debug("BernerBoxCoordinator: cache load failed: %s", e)
+            return False
+        if not isinstance(stored, dict):
+            return False
+        self.travel.load(stored.get("travel"))
+        if not isinstance(stored.get("items"), dict):
+            return False
+
+        items: Dict[int, ItemState] = {}
+        for key, raw in stored["items"].items():
+            try:
+                iid = int(key)
+                if iid in self._ids:
+                    items[iid] = ItemState(**raw)
+            except Exception:
+                continue
+        if not items:
+            return False
+
+        # Startdaten ohne Listener-Benachrichtigung setzen (Entities lesen sie beim Hinzufügen)
+        self.data = items
+        for iid, item in items.items():
+            self.names.setdefault(iid, item.name)
+        for iid in self._ids:
+            self.names.setdefault(iid, f"Item {iid}")
+        self.last_seen = stored.get("last_seen")
+        _LOGGER.debug("BernerBoxCoordinator: loaded %d item(s) from cache", len(items))
+        return True
+
+    def _cache_payload(self) -> Dict[str, Any]:
+        return {
+            "last_seen": self.last_seen,
+            "items": {str(iid): asdict(item) for iid, item in (self.data or {}).items()},
+            "travel": self.travel.as_dict(),
+        }
+
+    def _schedule_cache_save(self) -> None:
+        self._store.async_delay_save(self._cache_payload, CACHE_SAVE_DELAY)
+
+    def _diff(self, by_id: Dict[int, ItemState]) -> None:
+        """Items ermitteln, deren Zustand sich gegenüber dem letzten Zyklus geändert hat (Feldvergleich)."""
+        prev = self.data or {}
+        self.changed_ids = {k for k in by_id.keys() | prev.keys() if by_id.get(k) != prev.get(k)}
+
+    # ——— Inkrementelle Erkennung von Items ———
+    def _discover(self, seen: Set[int]) -> None:
+        """Neue id_item sofort übernehmen; fehlende nur zählen, wenn die Liste plausibel ist.
+
+        Leere Liste oder Massenschwund (Box bootet, Rechte-Problem) zählt nicht als Verschwinden –
+        sonst würden alle Entities samt Umbenennungen, Bereichen und Deaktivierungen gelöscht.
+        """
+        new = seen - self._ids
+        if new:
+            _LOGGER.info("BernerBox: neue Items erkannt: %s", sorted(new))
+            self._ids |= new
+            self._added_ids |= new
+            self._removed_ids -= new
+        for iid in seen & self._missing_since.keys():
+            del self._missing_since[iid]
+            self._missing_polls.pop(iid, None)
+        missing = self._ids - seen
+        if not missing:
+            return
+        if not seen or (len(missing) > 1 and len(missing) > DISCOVERY_MAX_MISSING_SHARE * len(self._ids)):
+            _LOGGER.debug(
+                "BernerBoxCoordinator: %d of %d item(s) missing from list, not counted as removed",
+                len(missing), len(self._ids),
+            )
+            return
+        now = time()
+        for iid in missing:
+            self._missing_since.setdefault(iid, now)
+            self._missing_polls[iid] = self._missing_polls.get(iid, 0) + 1
+
+    def _expire_missing(self) -> None:
+        """Items entfernen, die lange genug und in mehreren plausiblen Listen in Folge gefehlt haben."""
+        if not self._missing_since:
+            return
+        now = time()
+        gone = {
+            iid
+            for iid, since in self._missing_since.items()
+            if now - since >= DISCOVERY_REMOVE_AFTER and self._missing_polls.get(iid, 0) >= DISCOVERY_MIN_POLLS
+        }
+        if not gone:
+            return
+        _LOGGER.info("BernerBox: Items nicht mehr vorhanden, werden entfernt: %s", sorted(gone))
+        self._ids -= gone
+        self._added_ids -= gone
+        self._removed_ids |= gone
+        for iid in gone:
+            del self._missing_since[iid]
+            self._missing_polls.pop(iid, None)
+            self.names.pop(iid, None)
+            self.pending.pop(iid, None)
+            self.transitions.pop(iid, None)
+            self.travel.forget(iid)
+
+    @callback
+    def _async_publish_discovery(self) -> None:
+        """Nach dem Setzen der Daten: Plattformen über neue Items informieren, entfernte aus den Registries löschen."""
+        added, removed = sorted(self._added_ids), sorted(self._removed_ids)
+        if not added and not removed:
+            return
+        self._added_ids.clear()
+        self._removed_ids.clear()
+        if added:
+            async_dispatcher_send(self.hass, SIGNAL_ITEMS_ADDED.format(entry_id=self.entry_id), added)
+        if removed:
+            ent_reg = er.async_get(self.hass)
+            dev_reg = dr.async_get(self.hass)
+            prefixes = tuple(f"{DOMAIN}-{self.entry_id}-item-{iid}-" for iid in removed)
+            for ent in er.async_entries_for_config_entry(ent_reg, self.entry_id):
+                if ent.unique_id.startswith(prefixes):
+                    ent_reg.async_remove(ent.entity_id)
+            for iid in removed:
+                device = dev_reg.async_get_device(identifiers={(DOMAIN, f"{self.entry_id}-item-{iid}")})
+                if device is not None:
+                    dev_reg.async_update_device(device.id, remove_config_entry_id=self.entry_id)
+        # bekannte IDs im Eintrag merken (Neustart ohne erneute Erkennung)
+        entry = self.hass.config_entries.async_get_entry(self.entry_id)
+        if entry is not None:
+            self.hass.config_entries.async_update_entry(entry, data={**entry.data, "ids": self.ids})
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Nur Listener geänderter Items (Kontext = Item-ID) benachrichtigen; Box-weite immer."""
+        self._async_publish_discovery()
+        force = self.last_update_success != self._notified_success
+        self._notified_success = self.last_update_success
+        for update_callback, context in list(self._listeners.values()):
+            if force or context is None or context in self.changed_ids:
+                update_callback()
+            else:
+                self.suppressed_updates += 1
+
+    async def async_shutdown(self) -> None:
+        self._cancel_followup()
+        self._cancel_scheduled_updateall()
+        if self._updateall_task is not None and not self._updateall_task.done():
+            self._updateall_task.cancel()
+        await super().async_shutdown()
+
+    def apply_options(
+        self,
+        *,
+        fast_interval: float,
+        idle_interval: float,
+        timeout: float,
+        safety_interval: float,
+        settle_delay: float,
+    ) -> None:
+        """Geänderte Optionen im laufenden Betrieb übernehmen (kein Reload, Entities bleiben)."""
+        self.fast_interval = max(1.0, float(fast_interval))
+        self.idle_interval = max(self.fast_interval, float(idle_interval))
+        self._timeout = float(timeout)
+        self.safety_interval = float(safety_interval)
+        self.settle_delay = float(settle_delay)
+        # aktuelles Intervall in die neuen Grenzen einordnen und den Timer neu setzen
+        self._set_interval(min(max(self._interval_s, self.fast_interval), self.idle_interval))
+        if self._listeners:
+            self._schedule_refresh()
+        _LOGGER.debug(
+            "BernerBoxCoordinator: options applied (fast %.1fs, idle %.1fs, timeout %.1fs, safety %.0fs, settle %.1fs)",
+            self.fast_interval, self.idle_interval, self._timeout, self.safety_interval, self.settle_delay,
+        )
+
+    def _set_interval(self, seconds: float) -> None:
+        if seconds != self._interval_s:
+            _LOGGER.debug("BernerBoxCoordinator: poll interval %.1fs -> %.1fs", self._interval_s, seconds)
+        self._interval_s = seconds
+        if self._fleet is not None and seconds >= self.idle_interval:
+            # Ruhezustand: im eigenen Slot des Domain-Schedulers pollen (gestaffelt + Jitter)
+            self.update_interval = timedelta(seconds=self._fleet.next_delay(self.entry_id, seconds))
+        else:
+            self.update_interval = timedelta(seconds=seconds)
+
+    def _adapt_interval(self, by_id: Dict[int, ItemState]) -> None:
+        """Schnell bei Bewegung oder kurz nach Impuls, sonst schrittweise Backoff bis idle_interval.
+
+        Offene Impulse mit gelernter Fahrzeit halten das Intervall bis zum erwarteten Box-Poll (quiet_until).
+        """
+        now = monotonic()
+        quiet = [pt.quiet_until for pt in self.pending.values() if pt.quiet_until > now]
+        active = (
+            len(quiet) < len(self.pending)
+            or now < self._fast_until
+            or any(it.state == "moving" for it in by_id.values())
+        )
+        if active:
+            self._set_interval(self.fast_interval)
+        elif quiet:
+            # aktuelles Intervall beibehalten, aber spätestens zum ersten erwarteten Ankunfts-Poll holen
+            self._set_interval(max(self.fast_interval, min(self._interval_s, min(quiet) - now)))
+        else:
+            self._set_interval(min(self.idle_interval, self._interval_s * BACKOFF_FACTOR))
+
+    async def _async_update_data(self) -> Dict[int, ItemState]:
+        """Update-Zyklus mit Dauer-Messung (Diagnose)."""
+        started = monotonic()
+        try:
+            return await self._async_update_items()
+        finally:
+            self.last_cycle_duration = monotonic() - started
+
+    async def _async_update_items(self) -> Dict[int, ItemState]:
+        """Zentraler Update-Zyklus: ggf. updateAll starten, dann Liste holen."""
+        self.update_cycles += 1
+        self.changed_ids = set()
+        now = time()
+
+        # 0) Schutzschalter offen: nur die günstige Probe, Liste erst wieder, wenn die Box antwortet
+        breaker = self.api.breaker
+        if breaker.is_open and not await self.api.probe():
+            self._check_pending({})
+            self.update_interval = timedelta(seconds=max(self.fast_interval, breaker.next_probe_in()))
+            raise UpdateFailed(
+                f"BernerBox {self.api.host} nicht erreichbar ({breaker.failures} Fehler, "
+                f"nächste Probe in {breaker.next_probe_in():.0f}s)"
+            )
+
+        # 1) updateAll anstoßen, wenn fällig: offener Impuls oder 5-Min-Sicherheit
+        #    (geplante Termine laufen über eigene Timer, siehe schedule_updateall)
+        should_update = False
+        safety = False
+        if self._pending_needs_updateall(monotonic()):
+            should_update = True
+        elif self._safety_due(now):
+            should_update = safety = True
+
+        if should_update and self.api.breaker.is_open:
+            should_update = False  # Box nicht erreichbar: keine updateAll-Requests auftürmen
+        if should_update:
+            should_update = self._start_updateall()
+            if should_update and safety and self._fleet is not None:
+                self._fleet.note_safety_run(self.entry_id, now, self.safety_interval)
+
+        # 2) Liste holen (Hauptquelle für Zustände) – roh, Auswertung nur bei geändertem Inhalt
+        self.list_requests += 1
+        raw = await self.api.get_items_raw(self._timeout)
+        if raw is None:
+            self._check_pending({})
+            if breaker.is_open:
+                # Schutzschalter offen: Entities unavailable, nächster Zyklus genau zur nächsten Probe
+                self.update_interval = timedelta(seconds=max(self.fast_interval, breaker.next_probe_in()))
+                raise UpdateFailed(
+                    f"BernerBox {self.api.host} nicht erreichbar ({breaker.failures} Fehler, "
+                    f"nächste Probe in {breaker.next_probe_in():.0f}s)"
+                )
+            _LOGGER.warning("BernerBoxCoordinator: list request failed")
+            self._adapt_interval({})
+            return self.data or {}
+
+        digest = blake2b(raw, digest_size=16).digest() if raw is not NOT_MODIFIED else self._payload_digest
+        if digest == self._payload_digest and self.data is not None:
+            # Steady State: identische Liste → kein Decode, kein Diff, keine Entity-Benachrichtigung
+            self.last_seen = time()
+            self.unchanged_payloads += 1
+            if self._missing_since:
+                self._discover(set(self.data))   # unveränderte Liste zählt als weitere Bestätigung
+            self._expire_missing()
+            self._check_pending(self.data)
+            self._adapt_interval(self.data)
+            return self.data
+
+        try:
+            data = json_loads(raw)
+        except ValueError:
+            data = None
+        if isinstance(data, list):
+            self.last_seen = time()
+            self._payload_digest = digest
+        else:
+            _LOGGER.warning("BernerBoxCoordinator: list not a list -> %r", raw[:200])
+            self._check_pending({})
+            self._adapt_interval({})
+            return self.data or {}
+
+        # 3) Items einmal in ItemState umwandeln; neue/verschwundene IDs erkennen
+        by_id: Dict[int, ItemState] = {}
         for it in data:
             iid = it.get("id_item")
-            if iid and int(iid) in self._ids:
-                by_id[str(iid)] = it
+            if iid is None:
+                continue
+            try:
+                iidi = int(iid)
+            except Exception:
+                continue
+            by_id[iidi] = ItemState.from_raw(iidi, it)
+        self._discover(set(by_id))
+        self._expire_missing()
+
+        # 4) Namen beim ersten Auftauchen eines Items merken (nie überschreiben)
+        for iidi, item in by_id.items():
+            self.names.setdefault(iidi, item.name)
+        for iid in self._ids:
+            self.names.setdefault(iid, f"Item {iid}")
+
+        self._diff(by_id)
+        if self.changed_ids:
+            self._schedule_cache_save()
+        if not should_update:
+            self._check_updateall_progress(by_id)
+        self._check_pending(by_id)
+        self._adapt_interval(by_id)
+        _LOGGER.debug("BernerBoxCoordinator: fetched keys=%s (known=%s)", sorted(by_id.keys()), self.ids)
         return by_id
 
-async def async_get_coordinator(hass: HomeAssistant, entry_id: str) -> BernerBoxCoordinator:
-    """Factory: liefert den Coordinator, erzeugt ihn bei Bedarf einmalig."""
-    box_state = hass.data[DOMAIN][entry_id]
-    coord = box_state.get("coordinator")
-    if coord:
-        return coord
-
-    host = box_state["host"]
-    api_key = box_state["api_key"]
-    timeout = int(box_state.get("request_timeout", 6))
-    user_id = int(box_state.get("user_id", 1))
-    ids: List[int] = list(map(int, box_state.get("ids", []))) or list(range(1, 21))
-
-    coord = BernerBoxCoordinator(hass, host=host, api_key=api_key, user_id=user_id, timeout=timeout, ids=ids)
-    box_state["coordinator"] = coord
-    await coord.async_config_entry_first_refresh()
-    return coord
+
+class BernerBoxSettingsCoordinator(DataUpdateCoordinator[Dict[str, str]]):
+    """
+    Langsame Spur pro Box: getAllSettings einmal holen, nach Name indiziert cachen (TTL = Intervall)
+    und allen Box-Entities (SSH-Schalter, künftige Einstellungs-/Firmware-Sensoren) bereitstellen.
+    """
+
+    def __init__(self, hass: HomeAssistant, *, api: BernerBoxApiClient, ttl: float = SETTINGS_TTL) -> None:
+        super().__init__(hass, _LOGGER, name=f"BernerBox settings@{api.host}", update_interval=timedelta(seconds=ttl))
+        self.api = api
+        self.fetched_at: float | None = None
+
+    def value(self, name: str) -> Optional[str]:
+        return (self.data or {}).get(name)
+
+    def bool_value(self, name: str) -> Optional[bool]:
+        raw = self.value(name)
+        if raw is None:
+            return None
+        return raw.strip().lower() in ("1", "true", "on", "yes")
+
+    @callback
+    def async_set_optimistic(self, name: str, value: str) -> None:
+        """Eigene Änderung sofort übernehmen (ohne Request); Bestätigung kommt mit dem nächsten Refresh."""
+        self.async_set_updated_data({**(self.data or {}), name: value})
+
+    async def _async_update_data(self) -> Dict[str, str]:
+        rows = await self.api.get_all_settings()
+        if rows is None:
+            # wie beim Item-Coordinator: letzte bekannte Einstellungen behalten
+            _LOGGER.debug("BernerBoxSettingsCoordinator: getAllSettings failed, keeping cached settings")
+            return self.data or {}
+        settings: Dict[str, str] = {}
+        for row in rows:
+            if isinstance(row, dict) and row.get("name") is not None:
+                settings[str(row["name"])] = str(row.get("value", ""))
+        self.fetched_at = time()
+        return settings
+
+
+def async_get_coordinator(hass: HomeAssistant, entry_id: str) -> BernerBoxCoordinator:
+    """Liefert den einen, in __init__ erzeugten Coordinator des Config-Entries."""
+    return hass.data[DOMAIN][entry_id]["coordinator"]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from time import time
 from typing import Optional, List, Dict
 
 from homeassistant.components.cover import (
@@ -8,100 +9,63 @@ from homeassistant.components.cover import (
     CoverEntityFeature,
     CoverDeviceClass,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import DOMAIN
-from .sensor import STATUS_MAP
+from .commands import BernerBoxCommandQueue
+from .const import DOMAIN, SIGNAL_ITEMS_ADDED, SETTLED_STATES, COVER_OPTIMISTIC_TIMEOUT
+from .coordinator import async_get_coordinator, ItemState
 
 _LOGGER = logging.getLogger(__name__)
 
-# ----------------------- HTTP helpers -----------------------
-async def _get_json(session, url: str, timeout: int):
-    try:
-        async with session.get(url, timeout=timeout, headers={"Accept": "application/json"}) as resp:
-            if resp.status != 200:
-                txt = await resp.text()
-                _LOGGER.debug("GET %s -> %s %s", url, resp.status, txt[:200])
-                return None
-            return await resp.json(content_type=None)
-    except Exception as e:
-        _LOGGER.debug("GET fail %s (%s)", url, e)
-        return None
-
-
-async def _post_ok(session, url: str, payload: dict, timeout: int) -> bool:
-    try:
-        async with session.post(
-            url,
-            json=payload,
-            timeout=timeout,
-            headers={"Accept": "application/json", "Content-Type": "application/json"},
-        ) as resp:
-            text = await resp.text()
-            _LOGGER.debug("POST %s payload=%s -> %s %s", url, payload, resp.status, text[:200])
-            return resp.status == 200 and ('"status":"OK"' in text or '"funk_command_executed"' in text)
-    except Exception as e:
-        _LOGGER.debug("POST fail %s (%s)", url, e)
-        return False
-
-
 # ----------------------- Setup ------------------------------
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     data = hass.data[DOMAIN][entry.entry_id]
-    host: str = data["host"].rstrip("/")
-    api_key: str = data["api_key"]
-    timeout: int = int(data.get("request_timeout", 6))
-    user_id: int = int(data.get("user_id", 1))
-    ids: List[int] = list(map(int, data.get("ids", []))) or list(range(1, 21))
-
-    session = async_get_clientsession(hass)
-    coordinator = hass.data[DOMAIN][entry.entry_id].get("coordinator")
-
-    # 🔁 Sicherstellen, dass Namen verfügbar sind
-    names: Dict[int, str] = hass.data[DOMAIN][entry.entry_id].get("names", {})
-    if not names:
-        _LOGGER.debug("BernerBox Cover: Lade Namen direkt aus API (Fallback)")
-        url_list = f"{host}/api/item/getItemsByUser.json/{user_id}?api_key={api_key}"
-        lst = await _get_json(session, url_list, timeout)
-        if isinstance(lst, list):
-            for it in lst:
-                try:
-                    iid = int(it.get("id_item"))
-                    nm = str(it.get("name") or f"Item {iid}")
-                    names[iid] = nm
-                except Exception:
-                    continue
-        for iid in ids:
-            names.setdefault(iid, f"Item {iid}")
-        hass.data[DOMAIN][entry.entry_id]["names"] = names
-
-    entities: List[BernerBoxGarageCover] = []
-    for iid in ids:
-        name = names.get(iid, f"Item {iid}")
-        entities.append(
+    commands: BernerBoxCommandQueue = data["commands"]
+    coordinator = async_get_coordinator(hass, entry.entry_id)
+    ids: List[int] = coordinator.ids
+
+    # Namen stammen aus dem einen Start-Fetch des Coordinators (kein eigener Request)
+    names: Dict[int, str] = data["names"]
+
+    def _covers(item_ids: List[int]) -> List[BernerBoxGarageCover]:
+        return [
             BernerBoxGarageCover(
                 coordinator=coordinator,
                 entry_id=entry.entry_id,
-                host=host,
-                api_key=api_key,
+                commands=commands,
                 item_id=iid,
                 func_id=iid,
-                timeout=timeout,
-                display_name=name,
+                display_name=names.get(iid, f"Item {iid}"),
             )
-        )
+            for iid in item_ids
+        ]
 
+    entities = _covers(ids)
     async_add_entities(entities)
     _LOGGER.info("BernerBox: %d Garage-Cover(s) registriert", len(entities))
 
+    # Später erkannte Items ohne Reload ergänzen
+    @callback
+    def _async_add_items(item_ids: List[int]) -> None:
+        async_add_entities(_covers(item_ids))
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_ITEMS_ADDED.format(entry_id=entry.entry_id), _async_add_items)
+    )
+
 
 # ----------------------- Entity -----------------------------
 class BernerBoxGarageCover(CoordinatorEntity, CoverEntity):
-    """Garage Door (Cover) mit stabilem Namen & Status via Coordinator."""
+    """
+    Garage Door (Cover) mit stabilem Namen & Status via Coordinator.
+    Nach einem Impuls sofort „öffnet“/„schließt“ (Richtung aus dem letzten Zustand), bis die Box
+    einen neuen stabilen Zustand meldet, der Impuls als unbestätigt endet oder der Timeout greift.
+    """
 
     _attr_device_class = CoverDeviceClass.GARAGE
     _attr_supported_features = CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE
@@ -112,20 +76,16 @@ class BernerBoxGarageCover(CoordinatorEntity, CoverEntity):
         *,
         coordinator,
         entry_id: str,
-        host: str,
-        api_key: str,
+        commands: BernerBoxCommandQueue,
         item_id: int,
         func_id: int,
-        timeout: int,
         display_name: str,
     ):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=int(item_id))
         self._entry_id = entry_id
-        self._host = host
-        self._api_key = api_key
+        self._commands = commands
         self._item_id = int(item_id)
         self._func_id = int(func_id)
-        self._timeout = int(timeout)
 
         self._attr_name = display_name  # ✅ stabiler Friendly Name
         self._attr_unique_id = f"{DOMAIN}-{entry_id}-item-{self._item_id}-cover"
@@ -138,39 +98,26 @@ class BernerBoxGarageCover(CoordinatorEntity, CoverEntity):
 
         self._last_is_closed: Optional[bool] = None
 
+        # Optimistische Fahrtrichtung nach eigenem Impuls
+        self._optimistic: Optional[str] = None          # "opening" | "closing"
+        self._optimistic_from: Optional[str] = None     # Zustand beim Impuls
+        self._optimistic_since: float = 0.0             # epoch
+        self._unsub_rollback = None
+
     # --------- Helper ----------
     @property
-    def _entry(self) -> Optional[Dict]:
+    def _entry(self) -> Optional[ItemState]:
         data = getattr(self.coordinator, "data", None)
         if isinstance(data, dict):
-            return data.get(str(self._item_id))
+            return data.get(self._item_id)
         return None
 
     def _derive_is_closed(self) -> Optional[bool]:
         entry = self._entry
-        if not isinstance(entry, dict):
+        if entry is None:
             return self._last_is_closed
 
-        mc = entry.get("matchcode_item_type_status")
-        raw = entry.get("id_item_type_status")
-        state = None
-
-        if isinstance(mc, str):
-            state = STATUS_MAP.get(mc)
-            if not state:
-                mcl = mc.lower()
-                if "zu" in mcl:
-                    state = "closed"
-                elif "auf" in mcl:
-                    state = "open"
-                elif "beweg" in mcl:
-                    state = "moving"
-                elif "fehler" in mcl or "error" in mcl:
-                    state = "error"
-
-        if not state and raw is not None:
-            state = {"1": "open", "2": "closed", "3": "moving", "4": "error"}.get(str(raw))
-
+        state = entry.state
         if state == "closed":
             return True
         if state == "open":
@@ -184,6 +131,14 @@ class BernerBoxGarageCover(CoordinatorEntity, CoverEntity):
         self._last_is_closed = val
         return val
 
+    @property
+    def is_opening(self) -> bool:
+        return self._optimistic == "opening"
+
+    @property
+    def is_closing(self) -> bool:
+        return self._optimistic == "closing"
+
     async def async_open_cover(self, **kwargs) -> None:
         await self._impulse_and_schedule_updates()
 
@@ -192,25 +147,80 @@ class BernerBoxGarageCover(CoordinatorEntity, CoverEntity):
 
     # --------- Impuls mit Nachlauf-Updates ----------
     async def _impulse_and_schedule_updates(self) -> None:
-        session = async_get_clientsession(self.hass)
-        url = f"{self._host}/api/item/executeItemFunction.json?api_key={self._api_key}"
-        payload = {"id_item": self._item_id, "id_item_function": self._func_id}
-
-        ok = await _post_ok(session, url, payload, self._timeout)
-        if not ok:
-            _LOGGER.warning("BernerBox: Impuls (Cover) fehlgeschlagen (item=%s func=%s)", self._item_id, self._func_id)
+        started = self._start_optimistic()
+        result = await self._commands.async_send_impulse(self._item_id, self._func_id)
+        if result is None:
+            if started:
+                self._end_optimistic()
+            return  # Doppel-Impuls verworfen
+        if not result.ok:
+            self._end_optimistic()
+            _LOGGER.warning(
+                "BernerBox: Impuls (Cover) fehlgeschlagen (item=%s func=%s, %s)", self._item_id, self._func_id, result.error_code
+            )
             return
 
-        # updateAll nach 5s und 25s
-        try:
-            entry_data = self.hass.data[DOMAIN][self._entry_id]
-            coordinator = entry_data.get("coordinator")
-            if coordinator is not None and hasattr(coordinator, "schedule_updateall"):
-                for delay in (5, 25):
-                    coordinator.schedule_updateall(delay)
-                _LOGGER.debug(
-                    "BernerBox Cover: scheduled updateAll for item=%s at +5s and +25s",
-                    self._item_id,
-                )
-        except Exception as e:
-            _LOGGER.debug("BernerBox Cover: could not schedule updateAll: %s", e)
+        # Nachfragen bis die Box den neuen Zustand bestätigt
+        coordinator = self.hass.data[DOMAIN][self._entry_id].get("coordinator")
+        if coordinator is not None and hasattr(coordinator, "track_impulse"):
+            coordinator.track_impulse(self._item_id)
+            _LOGGER.debug("BernerBox Cover: tracking impulse for item=%s", self._item_id)
+
+    # --------- Optimistische Anzeige ----------
+    def _start_optimistic(self) -> bool:
+        """Richtung aus dem letzten stabilen Zustand vorhersagen; True, wenn neu gesetzt."""
+        if self._optimistic is not None:
+            return False
+        entry = self._entry
+        state = entry.state if entry is not None else None
+        if state == "closed" or (state is None and self._last_is_closed is True):
+            self._optimistic = "opening"
+        elif state == "open" or (state is None and self._last_is_closed is False):
+            self._optimistic = "closing"
+        else:
+            return False  # fährt gerade oder unbekannt: Impuls stoppt/ändert Richtung – keine Vorhersage
+        self._optimistic_from = "closed" if self._optimistic == "opening" else "open"
+        self._optimistic_since = time()
+
+        timeout = COVER_OPTIMISTIC_TIMEOUT
+        stats = self.coordinator.travel.stats(self._item_id) if hasattr(self.coordinator, "travel") else None
+        if stats is not None:
+            timeout = max(timeout, 1.5 * stats.p90)
+        self._unsub_rollback = async_call_later(self.hass, timeout, self._handle_rollback)
+        self.async_write_ha_state()
+        return True
+
+    @callback
+    def _end_optimistic(self, *, write: bool = True) -> None:
+        if self._unsub_rollback is not None:
+            self._unsub_rollback()
+            self._unsub_rollback = None
+        if self._optimistic is None:
+            return
+        self._optimistic = None
+        self._optimistic_from = None
+        if write:
+            self.async_write_ha_state()
+
+    @callback
+    def _handle_rollback(self, _now) -> None:
+        self._unsub_rollback = None
+        _LOGGER.debug("BernerBox Cover[%s]: keine Bestätigung, optimistischen Zustand zurückgenommen", self._item_id)
+        self._end_optimistic()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Abgleich: neuer stabiler Zustand oder abgeschlossener Impuls beendet die Vorhersage."""
+        if self._optimistic is not None:
+            entry = self._entry
+            state = entry.state if entry is not None else None
+            tr = self.coordinator.transitions.get(self._item_id) if hasattr(self.coordinator, "transitions") else None
+            if (state in SETTLED_STATES and state != self._optimistic_from) or (
+                tr is not None and tr.finished_at >= self._optimistic_since
+            ):
+                self._end_optimistic(write=False)
+        super()._handle_coordinator_update()
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._end_optimistic(write=False)
+        await super().async_will_remove_from_hass()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from time import monotonic
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .scheduler import async_get_fleet_scheduler
+
+TO_REDACT = {"api_key", "password", "username"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Diagnose-Download: Laufzeit-Metriken je Endpunkt, Coordinator-Zähler, letzte API-Aufrufe, Queue und Slots (ohne api_key)."""
+    store = hass.data[DOMAIN][entry.entry_id]
+    coordinator = store["coordinator"]
+    api = store["api"]
+    commands = store["commands"]
+    now = monotonic()
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "last_cycle_duration": coordinator.last_cycle_duration,
+            "last_seen": coordinator.last_seen,
+            "update_cycles": coordinator.update_cycles,
+            "list_requests": coordinator.list_requests,
+            "updateall_requests": coordinator.updateall_requests,
+            "suppressed_updates": coordinator.suppressed_updates,
+            "unchanged_payloads": coordinator.unchanged_payloads,
+            "items": len(coordinator.data or {}),
+            "timestamp_executed": {iid: it.timestamp_executed for iid, it in (coordinator.data or {}).items()},
+            "pending": {iid: round(now - pt.started, 1) for iid, pt in coordinator.pending.items()},
+            "travel": {
+                iid: {"median": st.median, "p90": st.p90, "samples": st.samples}
+                for iid in coordinator.ids
+                if (st := coordinator.travel.stats(iid)) is not None
+            },
+        },
+        "endpoints": api.metrics_snapshot(),
+        "trace": api.trace.as_list(),
+        "breaker": api.breaker.as_dict(),
+        "commands": commands.stats(),
+        "fleet": async_get_fleet_scheduler(hass).slot_distribution(coordinator.safety_interval),
+    }
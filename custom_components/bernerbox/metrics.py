@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timezone
+from time import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .const import METRICS_WINDOW, TRACE_SIZE
+
+
+class EndpointMetrics:
+    """
+    Laufzeit-Statistik eines API-Endpunkts:
+    - Anzahl Requests, Fehler, Timeouts, übertragene Bytes
+    - Latenzen der letzten `window` Requests für p50/p95, dazu Maximum seit Start
+    """
+
+    __slots__ = ("count", "errors", "timeouts", "bytes", "max_latency", "last_latency", "_latencies")
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        self.count: int = 0
+        self.errors: int = 0
+        self.timeouts: int = 0
+        self.bytes: int = 0
+        self.max_latency: float = 0.0
+        self.last_latency: float | None = None
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float, *, size: int = 0, error: bool = False, timeout: bool = False) -> None:
+        self.count += 1
+        self.bytes += size
+        if error:
+            self.errors += 1
+        if timeout:
+            self.timeouts += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._latencies.append(latency)
+
+    def percentile(self, q: float) -> float | None:
+        """Latenz-Perzentil (0..1) über das Fenster (nächster Rang)."""
+        if not self._latencies:
+            return None
+        values = sorted(self._latencies)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        def _ms(v: float | None) -> float | None:
+            return None if v is None else round(v * 1000, 1)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "bytes": self.bytes,
+            "latency_p50_ms": _ms(self.percentile(0.5)),
+            "latency_p95_ms": _ms(self.percentile(0.95)),
+            "latency_max_ms": _ms(self.max_latency if self.count else None),
+            "latency_last_ms": _ms(self.last_latency),
+        }
+
+
+class CallTrace:
+    """
+    Ringpuffer der letzten `size` API-Aufrufe einer Box (immer aktiv, für Diagnose):
+    - je Aufruf ein Tupel (Start, Dauer, Endpunkt, HTTP-Status, Bytes, Ergebnis)
+    - nur Endpunktnamen, keine URLs → kein api_key im Puffer
+    - Formatierung erst beim Export
+    """
+
+    __slots__ = ("_calls",)
+
+    def __init__(self, size: int = TRACE_SIZE) -> None:
+        self._calls: Deque[Tuple[float, float, str, Optional[int], int, str]] = deque(maxlen=size)
+
+    def add(self, endpoint: str, duration: float, *, status: int | None, size: int, outcome: str) -> None:
+        self._calls.append((time() - duration, duration, endpoint, status, size, outcome))
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "start": datetime.fromtimestamp(start, timezone.utc).isoformat(timespec="milliseconds"),
+                "duration_ms": round(duration * 1000, 1),
+                "endpoint": endpoint,
+                "status": status,
+                "size": size,
+                "outcome": outcome,
+            }
+            for start, duration, endpoint, status, size, outcome in self._calls
+        ]
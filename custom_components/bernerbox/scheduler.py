@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+from time import monotonic
+from typing import Any, Dict, List
+
+from homeassistant.core import HomeAssistant
+
+from .const import FLEET_DATA_KEY, FLEET_MAX_CONCURRENT, FLEET_JITTER
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BernerBoxFleetScheduler:
+    """
+    Domain-weiter Taktgeber für alle Boxen (Config-Entries):
+    - jede Box bekommt einen Slot (Phase) im Poll-/Sicherheitsintervall, gleichmäßig verteilt
+      (bei jeder Prüfung aus der aktuellen Mitgliederliste, nicht einmalig beim Start)
+    - pro Zyklus etwas Jitter, damit die Boxen nicht im Gleichschritt laufen
+    - globale Obergrenze gleichzeitiger Requests über alle Boxen
+    """
+
+    def __init__(self, max_concurrent: int = FLEET_MAX_CONCURRENT) -> None:
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self._members: List[str] = []
+        self._applied: Dict[str, float] = {}      # Offset des letzten Sicherheitslaufs je Box
+
+    def register(self, entry_id: str) -> None:
+        if entry_id not in self._members:
+            self._members.append(entry_id)
+
+    def unregister(self, entry_id: str) -> None:
+        if entry_id in self._members:
+            self._members.remove(entry_id)
+        self._applied.pop(entry_id, None)
+
+    def phase(self, entry_id: str) -> float:
+        """Slot der Box als Bruchteil [0, 1) des Intervalls."""
+        if entry_id not in self._members:
+            return 0.0
+        return self._members.index(entry_id) / len(self._members)
+
+    def next_delay(self, entry_id: str, interval: float) -> float:
+        """Verzögerung bis zum nächsten Slot der Box (zwischen 0.5 und 1.5 Intervallen, mit Jitter)."""
+        n = max(1, len(self._members))
+        offset = self.phase(entry_id) * interval
+        jitter = random.uniform(-FLEET_JITTER, FLEET_JITTER) * interval / n
+        now = monotonic()
+        target = math.ceil((now - offset) / interval) * interval + offset + jitter
+        delay = target - now
+        while delay < interval / 2:
+            delay += interval
+        return delay
+
+    def safety_slot_due(self, entry_id: str, interval: float, last_run: float, now: float) -> bool:
+        """
+        Sicherheits-updateAll fällig? Gemeinsames Raster (epoch) für alle Boxen, Box k im Slot k/n:
+        - Phase wird bei jeder Prüfung aus der aktuellen Mitgliederliste berechnet → kommt eine Box
+          hinzu oder fällt weg, verteilen sich alle Boxen sofort neu gleichmäßig
+        - fällig, sobald der letzte Slot-Zeitpunkt nach dem letzten Lauf liegt
+        """
+        offset = self.phase(entry_id) * interval
+        slot = math.floor((now - offset) / interval) * interval + offset
+        return last_run < slot
+
+    def note_safety_run(self, entry_id: str, at: float, interval: float) -> None:
+        """Tatsächlichen Zeitpunkt (epoch) eines Sicherheitslaufs als Offset im Raster merken."""
+        self._applied[entry_id] = at % interval
+
+    def slot_distribution(self, interval: float) -> List[Dict[str, Any]]:
+        """Slot je Box: geplanter Offset und Offset des letzten tatsächlichen Sicherheitslaufs (Sekunden)."""
+        return [
+            {
+                "entry_id": entry_id,
+                "offset": round(self.phase(entry_id) * interval, 2),
+                "applied": round(applied, 2) if (applied := self._applied.get(entry_id)) is not None else None,
+            }
+            for entry_id in self._members
+        ]
+
+
+def async_get_fleet_scheduler(hass: HomeAssistant) -> BernerBoxFleetScheduler:
+    """Einmaliger Scheduler pro HA-Instanz (über alle BernerBox-Einträge)."""
+    fleet = hass.data.get(FLEET_DATA_KEY)
+    if fleet is None:
+        fleet = hass.data[FLEET_DATA_KEY] = BernerBoxFleetScheduler()
+    return fleet
@@ -1,189 +1,141 @@
 from __future__ import annotations
 
-from datetime import timedelta
-import asyncio
+from dataclasses import dataclass
+from datetime import datetime
 import logging
-from time import time
-from typing import Dict, Any, Optional, List
+from typing import Any, Callable, Optional, List
 
-from aiohttp import ClientTimeout
-
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.update_coordinator import (
-    DataUpdateCoordinator,
-    CoordinatorEntity,
-)
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
-DOMAIN = "bernerbox"
+from .const import DOMAIN, SIGNAL_ITEMS_ADDED, LAST_SEEN_THROTTLE
+from .coordinator import BernerBoxCoordinator, ItemState, async_get_coordinator
 
 _LOGGER = logging.getLogger(__name__)
 
-# 🔁 App-ähnliches Verhalten:
-SCAN_INTERVAL = timedelta(seconds=30)   # getItems alle 30s
-UPDATEALL_SAFETY_INTERVAL = 300        # zusätzlicher Refresh alle 5 Minuten
-POST_IMPULSE_DELAYS = (5, 25)          # +5s und +25s nach Button
-
-# Mappings für Statusableitung
-STATUS_MAP = {
-    "item_type_status_zu": "closed",
-    "item_type_status_auf": "open",
-    "item_type_status_in_bewegung": "moving",
-    "item_type_status_fehlfunktion": "error",
-}
-NUM_STATUS_MAP = {"1": "open", "2": "closed", "3": "moving", "4": "error"}
-TEXT_FALLBACK = {"zu": "closed", "auf": "open", "beweg": "moving", "error": "error", "fehler": "error"}
-
-
-async def _get_json(session, url: str, timeout: int) -> Optional[Any]:
-    """HTTP-GET als JSON (fehlertolerant)."""
-    try:
-        async with session.get(url, timeout=timeout, headers={"Accept": "application/json"}) as resp:
-            if resp.status != 200:
-                txt = await resp.text()
-                _LOGGER.debug("GET %s -> %s %s", url, resp.status, txt[:200])
-                return None
-            return await resp.json(content_type=None)
-    except Exception as e:
-        _LOGGER.debug("GET fail %s (%s)", url, e)
-        return None
-
-
-async def _fire_and_forget_get(session, url: str) -> None:
-    """Startet einen GET ohne Coordinator zu blockieren (kein Gesamt-Timeout)."""
-    try:
-        async with session.get(url, timeout=ClientTimeout(total=None), headers={"Accept": "application/json"}) as resp:
-            await resp.read()
-    except Exception as e:
-        _LOGGER.debug("updateAll fire-and-forget error: %s", e)
-
-
-class BernerBoxCoordinator(DataUpdateCoordinator[Dict[str, Dict[str, Any]]]):
-    """
-    Koordiniert Polling & Update-Plan:
-    - getItemsByUser: alle 30s
-    - updateAllItemsByUser: planbar (+5s/+25s nach Impuls) + Sicherheitslauf alle 5min
-    - niemals UpdateFailed werfen → alte Daten bleiben erhalten
-    """
 
-    def __init__(self, hass: HomeAssistant, *, host: str, api_key: str, user_id: int, timeout: int, ids: List[int]) -> None:
-        super().__init__(hass, _LOGGER, name=f"BernerBox@{host}", update_interval=SCAN_INTERVAL)
-        self._host = host.rstrip("/")
-        self._api_key = api_key
-        self._user_id = user_id
-        self._timeout = max(int(timeout), 10)
-        self._ids = [int(i) for i in ids]
-        self._session = async_get_clientsession(hass)
-
-        # Stabile Namen einmalig merken; werden nie überschrieben
-        self.names: Dict[int, str] = {}
-
-        # Zeitmanagement
-        self.last_seen: float | None = None        # erfolgreiche Liste
-        self._last_updateall: float = 0.0          # letzter Sicherheitslauf
-        self._due_updates: List[float] = []        # geplante updateAll-Zeitpunkte (epoch)
-
-    # ——— Planer-API: vom Button nutzbar ———
-    def schedule_updateall(self, delay_s: int) -> None:
-        ts = time() + max(0, int(delay_s))
-        self._due_updates.append(ts)
-        # doppelte/alte Termine aufräumen
-        now = time()
-        self._due_updates = sorted(t for t in self._due_updates if t >= now - 1)
-        _LOGGER.debug("BernerBoxCoordinator: scheduled updateAll at %s (queue=%s)", int(ts), [int(t) for t in self._due_updates])
-
-    async def _async_update_data(self) -> Dict[str, Dict[str, Any]]:
-        """Zentraler Update-Zyklus: ggf. updateAll starten, dann Liste holen."""
-        now = time()
-        url_update = f"{self._host}/api/item/updateAllItemsByUser.json/{self._user_id}?api_key={self._api_key}"
-        url_list   = f"{self._host}/api/item/getItemsByUser.json/{self._user_id}?api_key={self._api_key}"
-
-        # 1) updateAll anstoßen, wenn fällig: geplante Termine oder 5-Min-Sicherheit
-        should_update = False
-        if self._due_updates and self._due_updates[0] <= now:
-            should_update = True
-            self._due_updates.pop(0)
-        elif now - self._last_updateall >= UPDATEALL_SAFETY_INTERVAL:
-            should_update = True
-
-        if should_update:
-            _LOGGER.debug("BernerBoxCoordinator: calling updateAll (fire-and-forget) -> %s", url_update)
-            self.hass.async_create_task(_fire_and_forget_get(self._session, url_update))
-            self._last_updateall = now
-            await asyncio.sleep(3.5)  # Box kurz „Luft“ lassen
-
-        # 2) Liste holen (Hauptquelle für Zustände)
-        data = await _get_json(self._session, url_list, self._timeout)
-        if isinstance(data, list):
-            self.last_seen = time()
-        else:
-            _LOGGER.warning("BernerBoxCoordinator: list not a list -> %r", data)
-            return self.data or {}
-
-        # 3) Namen beim ersten Mal füllen
-        if not self.names:
-            for it in data:
-                try:
-                    iid = int(it.get("id_item"))
-                    nm = (it.get("name") or f"Item {iid}").strip()
-                    self.names[iid] = nm
-                except Exception:
-                    continue
-            for iid in self._ids:
-                self.names.setdefault(iid, f"Item {iid}")
-
-        # 4) Nur konfigurierte IDs in Dict packen
-        by_id: Dict[str, Dict[str, Any]] = {}
-        for it in data:
-            iid = it.get("id_item")
-            if iid is None:
-                continue
-            try:
-                iidi = int(iid)
-            except Exception:
-                continue
-            if iidi in self._ids:
-                by_id[str(iidi)] = it
-
-        _LOGGER.debug("BernerBoxCoordinator: fetched keys=%s (configured=%s)", sorted(by_id.keys()), self._ids)
-        return by_id
+@dataclass(frozen=True, kw_only=True)
+class BernerBoxMetricDescription(SensorEntityDescription):
+    """Box-weiter Diagnose-Sensor, Wert aus Coordinator/API-Metriken."""
+
+    value_fn: Callable[[BernerBoxCoordinator], Any]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _total(coordinator: BernerBoxCoordinator, key: str) -> int:
+    return sum(getattr(m, key) for m in coordinator.api.metrics.values())
+
+
+def _list_p95(coordinator: BernerBoxCoordinator) -> Optional[float]:
+    m = coordinator.api.metrics.get("getItemsByUser")
+    return _ms(m.percentile(0.95)) if m is not None else None
+
+
+METRIC_SENSORS: tuple[BernerBoxMetricDescription, ...] = (
+    BernerBoxMetricDescription(
+        key="cycle_duration",
+        entity_registry_enabled_default=False,
+        name="Dauer Update-Zyklus",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda c: _ms(c.last_cycle_duration),
+    ),
+    BernerBoxMetricDescription(
+        key="list_latency_p95",
+        entity_registry_enabled_default=False,
+        name="Latenz Liste p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_list_p95,
+    ),
+    BernerBoxMetricDescription(
+        key="requests",
+        entity_registry_enabled_default=False,
+        name="API-Requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: _total(c, "count"),
+    ),
+    BernerBoxMetricDescription(
+        key="request_errors",
+        entity_registry_enabled_default=False,
+        name="API-Fehler",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: _total(c, "errors"),
+    ),
+    BernerBoxMetricDescription(
+        key="request_timeouts",
+        entity_registry_enabled_default=False,
+        name="API-Timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: _total(c, "timeouts"),
+    ),
+    BernerBoxMetricDescription(
+        key="circuit_breaker",
+        name="Verbindung",
+        device_class=SensorDeviceClass.ENUM,
+        options=["closed", "open", "half_open"],
+        value_fn=lambda c: c.api.breaker.state,
+    ),
+)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
-    data = hass.data[DOMAIN][entry.entry_id]
-    host: str = data["host"].rstrip("/")
-    api_key: str = data["api_key"]
-    timeout: int = int(data.get("request_timeout", 6))
-    user_id: int = int(data.get("user_id", 1))
-    ids: List[int] = list(map(int, data.get("ids", []))) or list(range(1, 21))
-
-    coordinator = BernerBoxCoordinator(
-        hass, host=host, api_key=api_key, user_id=user_id, timeout=timeout, ids=ids
-    )
-    hass.data[DOMAIN][entry.entry_id]["coordinator"] = coordinator
-
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = async_get_coordinator(hass, entry.entry_id)
+    ids: List[int] = coordinator.ids
 
-    entities: List[BernerBoxItemStateSensor] = []
-    for iid in ids:
-        name = coordinator.names.get(iid, f"Item {iid}")
-        entities.append(
+    def _status_sensors(item_ids: List[int]) -> List[SensorEntity]:
+        return [
             BernerBoxItemStateSensor(
                 coordinator=coordinator,
                 entry_id=entry.entry_id,
                 item_id=iid,
-                display_name=f"{name} Status",
-                base_name=name,
+                display_name=f"{coordinator.names.get(iid, f'Item {iid}')} Status",
+                base_name=coordinator.names.get(iid, f"Item {iid}"),
             )
-        )
+            for iid in item_ids
+        ]
+
+    entities: List[SensorEntity] = _status_sensors(ids)
+
+    # Box-Frische (gedrosselt) statt last_seen-Attribut an jedem Item
+    entities.append(BernerBoxLastSeenSensor(coordinator=coordinator, entry_id=entry.entry_id))
+
+    # Laufzeit-Metriken + Verbindungszustand am BERNER-BOX-Gerät (Metriken standardmäßig deaktiviert)
+    entities.extend(
+        BernerBoxMetricSensor(coordinator=coordinator, entry_id=entry.entry_id, description=description)
+        for description in METRIC_SENSORS
+    )
 
     async_add_entities(entities)
     _LOGGER.info(
-        "BernerBox: %d Status-Sensor(en) registriert (User %s, getItems %ss, updateAll: +5/+25s nach Impuls & alle 300s)",
-        len(entities), user_id, int(SCAN_INTERVAL.total_seconds())
+        "BernerBox: %d Status-Sensor(en) registriert (User %s, getItems %s–%ss adaptiv, updateAll: nach Impuls & alle %ss)",
+        len(ids), hass.data[DOMAIN][entry.entry_id].get("user_id", 1),
+        coordinator.fast_interval, coordinator.idle_interval, coordinator.safety_interval,
+    )
+
+    # Später erkannte Items ohne Reload ergänzen
+    @callback
+    def _async_add_items(item_ids: List[int]) -> None:
+        async_add_entities(_status_sensors(item_ids))
+
+    entry.async_on_unload(
+        async_dispatcher_connect(hass, SIGNAL_ITEMS_ADDED.format(entry_id=entry.entry_id), _async_add_items)
     )
 
 
@@ -192,9 +144,17 @@ class BernerBoxItemStateSensor(CoordinatorEntity[BernerBoxCoordinator], SensorEn
 
     _attr_should_poll = False
     _attr_icon = "mdi:garage"
+    # Rohwerte/Dauer nicht in die Recorder-Attribute übernehmen
+    _unrecorded_attributes = frozenset({
+        "raw_source",
+        "id_item_type_status",
+        "id_item_type_torlage",
+        "id_item_type_error",
+        "last_transition_duration",
+    })
 
     def __init__(self, *, coordinator: BernerBoxCoordinator, entry_id: str, item_id: int, display_name: str, base_name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=int(item_id))
         self._entry_id = entry_id
         self._item_id = int(item_id)
 
@@ -212,8 +172,6 @@ class BernerBoxItemStateSensor(CoordinatorEntity[BernerBoxCoordinator], SensorEn
         self._last_state: Optional[str] = None
         self._attr_native_value = None
         self._attr_extra_state_attributes = {
-            "last_seen": None,
-            "last_seen_age": None,
             "reachable": None,
             "matchcode_item_type_status": None,
             "matchcode_item_type_torlage": None,
@@ -221,72 +179,63 @@ class BernerBoxItemStateSensor(CoordinatorEntity[BernerBoxCoordinator], SensorEn
             "id_item_type_status": None,
             "id_item_type_torlage": None,
             "id_item_type_error": None,
-            "timestamp_executed": None,
+            "last_transition_state": None,
+            "last_transition_confirmed": None,
+            "last_transition_duration": None,
             "raw_source": "getItemsByUser (coordinated)",
         }
 
     @property
-    def _entry(self) -> Optional[Dict[str, Any]]:
+    def _entry(self) -> Optional[ItemState]:
         if not isinstance(self.coordinator.data, dict):
             return None
-        return self.coordinator.data.get(str(self._item_id))
-
-    def _derive_state(self, entry: Dict[str, Any]) -> Optional[str]:
-        mc = entry.get("matchcode_item_type_status")
-        if isinstance(mc, str):
-            st = STATUS_MAP.get(mc)
-            if st:
-                return st
-            mcl = mc.lower()
-            for key, val in TEXT_FALLBACK.items():
-                if key in mcl:
-                    return val
-        raw_id = entry.get("id_item_type_status")
-        if raw_id is not None:
-            st = NUM_STATUS_MAP.get(str(raw_id))
-            if st:
-                return st
-        return None
-
-    def _update_from_entry(self, entry: Dict[str, Any]) -> None:
-        # „Frische“ der Liste anzeigen
-        ls = getattr(self.coordinator, "last_seen", None)
-        age = None
-        if isinstance(ls, (int, float)):
-            age = max(0, int(time() - ls))
-        self._attr_extra_state_attributes["last_seen"] = ls
-        self._attr_extra_state_attributes["last_seen_age"] = age
-
-        # Rohattribute übernehmen
+        return self.coordinator.data.get(self._item_id)
+
+    def _update_from_entry(self, entry: ItemState) -> None:
+        # Rohattribute übernehmen – nur stabile Werte; Frische der Liste zeigt der Box-Sensor „Letzte Aktualisierung“,
+        # timestamp_executed (ändert sich bei jedem updateAll) steht in der Diagnose
         self._attr_extra_state_attributes.update({
             "reachable": True,
-            "matchcode_item_type_status": entry.get("matchcode_item_type_status"),
-            "matchcode_item_type_torlage": entry.get("matchcode_item_type_torlage"),
-            "matchcode_item_type_error": entry.get("matchcode_item_type_error"),
-            "id_item_type_status": entry.get("id_item_type_status"),
-            "id_item_type_torlage": entry.get("id_item_type_torlage"),
-            "id_item_type_error": entry.get("id_item_type_error"),
-            "timestamp_executed": entry.get("timestamp_executed"),
+            "matchcode_item_type_status": entry.matchcode_status,
+            "matchcode_item_type_torlage": entry.matchcode_torlage,
+            "matchcode_item_type_error": entry.matchcode_error,
+            "id_item_type_status": entry.id_status,
+            "id_item_type_torlage": entry.id_torlage,
+            "id_item_type_error": entry.id_error,
         })
 
-        new_state = self._derive_state(entry)
+        # Ergebnis des letzten Impulses (bestätigt/Timeout + Dauer)
+        tr = self.coordinator.transitions.get(self._item_id)
+        if tr is not None:
+            self._attr_extra_state_attributes.update({
+                "last_transition_state": tr.state,
+                "last_transition_confirmed": tr.confirmed,
+                "last_transition_duration": tr.duration,
+            })
+
+        new_state = entry.state
         if new_state:
             self._attr_native_value = new_state
             self._last_state = new_state
         else:
             self._attr_native_value = self._last_state or "unknown"
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Startzustand setzen – spätere Updates kommen nur noch bei Änderung des Items
+        self._handle_coordinator_update()
+
     def _handle_coordinator_update(self) -> None:
         entry = self._entry
-        if isinstance(entry, dict):
+        if entry is not None:
             self._update_from_entry(entry)
             _LOGGER.debug(
                 "BernerBoxSensor[%s]: updated -> state=%s mc=%r raw=%r ts=%r",
                 self._item_id,
                 self._attr_native_value,
-                entry.get("matchcode_item_type_status"),
-                entry.get("id_item_type_status"),
-                entry.get("timestamp_executed"),
+                entry.matchcode_status,
+                entry.id_status,
+                entry.timestamp_executed,
             )
         else:
             self._attr_extra_state_attributes["reachable"] = True
@@ -297,3 +246,77 @@ class BernerBoxItemStateSensor(CoordinatorEntity[BernerBoxCoordinator], SensorEn
                 sorted(list(self.coordinator.data.keys())) if isinstance(self.coordinator.data, dict) else type(self.coordinator.data),
             )
         super()._handle_coordinator_update()
+
+
+class BernerBoxMetricSensor(CoordinatorEntity[BernerBoxCoordinator], SensorEntity):
+    """Diagnose-Sensor der Box (Laufzeit-Metriken); aktualisiert sich mit jedem Zyklus."""
+
+    entity_description: BernerBoxMetricDescription
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, *, coordinator: BernerBoxCoordinator, entry_id: str, description: BernerBoxMetricDescription):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_name = description.name
+        self._attr_unique_id = f"{DOMAIN}-{entry_id}-metric-{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry_id}-box")},
+            name="BERNER-BOX",
+            manufacturer="Berner Torantriebe KG",
+            model="BERNER-BOX",
+        )
+
+    @property
+    def available(self) -> bool:
+        # Metriken bleiben gerade dann sichtbar, wenn die Box nicht antwortet
+        return True
+
+    @property
+    def native_value(self) -> Any:
+        return self.entity_description.value_fn(self.coordinator)
+
+
+class BernerBoxLastSeenSensor(CoordinatorEntity[BernerBoxCoordinator], SensorEntity):
+    """
+    Box-weiter Zeitstempel der letzten erfolgreichen Liste (ersetzt last_seen/last_seen_age an jedem Item).
+    Gedrosselt: neuer Zustand höchstens alle LAST_SEEN_THROTTLE Sekunden → kaum Recorder-Zeilen.
+    """
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_name = "Letzte Aktualisierung"
+
+    def __init__(self, *, coordinator: BernerBoxCoordinator, entry_id: str):
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{DOMAIN}-{entry_id}-last-seen"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry_id}-box")},
+            name="BERNER-BOX",
+            manufacturer="Berner Torantriebe KG",
+            model="BERNER-BOX",
+        )
+        self._written: Optional[float] = None
+        self._written_available: Optional[bool] = None
+
+    @property
+    def native_value(self) -> Optional[datetime]:
+        if self._written is None:
+            return None
+        return dt_util.utc_from_timestamp(self._written)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        ls = self.coordinator.last_seen
+        changed_availability = self.available != self._written_available
+        if isinstance(ls, (int, float)) and (self._written is None or ls - self._written >= LAST_SEEN_THROTTLE):
+            self._written = ls
+        elif not changed_availability:
+            return
+        self._written_available = self.available
+        self.async_write_ha_state()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN, SERVICE_EXECUTE_ITEMS
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_ITEMS = "items"
+ATTR_TARGET = "target"
+
+EXECUTE_ITEMS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_ITEMS): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+    vol.Required(ATTR_TARGET): vol.In(["open", "closed"]),
+})
+
+
+def _entry_store(hass: HomeAssistant, entry_id: str | None) -> Dict[str, Any]:
+    """Store der gewählten Box; ohne Angabe nur eindeutig, wenn genau eine Box geladen ist."""
+    # nur fertig eingerichtete Boxen (Einträge im Setup haben noch keinen Coordinator)
+    boxes: Dict[str, Dict[str, Any]] = {
+        entry_id: store for entry_id, store in hass.data.get(DOMAIN, {}).items() if "coordinator" in store
+    }
+    if entry_id is None:
+        if len(boxes) != 1:
+            raise ServiceValidationError(f"{ATTR_CONFIG_ENTRY_ID} angeben ({len(boxes)} Boxen geladen)")
+        return next(iter(boxes.values()))
+    store = boxes.get(entry_id)
+    if store is None:
+        raise ServiceValidationError(f"BernerBox {entry_id} ist nicht geladen")
+    return store
+
+
+async def _async_execute_items(call: ServiceCall) -> ServiceResponse:
+    """
+    Mehrere Tore in einen Zielzustand bringen:
+    - Tore, die laut Coordinator schon im Ziel sind (oder gerade fahren), werden übersprungen
+    - Tore mit unbekanntem Zustand/Fehler bekommen keinen Impuls (Impuls = Umschalten, Richtung ungewiss)
+    - Impulse laufen getaktet über die Befehls-Queue der Box
+    - ein gemeinsamer Bestätigungs-Plan für alle gesendeten Tore
+    """
+    store = _entry_store(call.hass, call.data.get(ATTR_CONFIG_ENTRY_ID))
+    coordinator = store["coordinator"]
+    commands = store["commands"]
+    target: str = call.data[ATTR_TARGET]
+    data = coordinator.data or {}
+    known = set(coordinator.ids)
+
+    results: Dict[int, Dict[str, Any]] = {}
+    to_send: List[int] = []
+    for iid in dict.fromkeys(call.data[ATTR_ITEMS]):  # Reihenfolge behalten, Dubletten raus
+        item = data.get(iid)
+        state = item.state if item is not None else None
+        if iid not in known:
+            results[iid] = {"result": "unknown_item"}
+        elif state == target:
+            results[iid] = {"result": "skipped", "state": state}
+        elif state == "moving" or iid in coordinator.pending:
+            # ein weiterer Impuls würde das fahrende Tor stoppen
+            results[iid] = {"result": "busy", "state": state}
+        elif state not in ("open", "closed"):
+            # z.B. nie gemeldet/Cache-Lücke oder Störung: ein Impuls könnte das Tor in die falsche Richtung fahren
+            results[iid] = {"result": "unknown_state", "state": state}
+        else:
+            to_send.append(iid)
+
+    # Queue serialisiert und hält den Funk-Mindestabstand ein; Ausnahme eines Tors bricht die anderen nicht ab
+    acks = await asyncio.gather(
+        *(commands.async_send_impulse(iid, iid) for iid in to_send), return_exceptions=True
+    )
+    sent: List[int] = []
+    for iid, ack in zip(to_send, acks):
+        if isinstance(ack, BaseException):
+            _LOGGER.warning("BernerBox: Impuls für Item %s fehlgeschlagen: %r", iid, ack)
+            results[iid] = {"result": "failed", "error": type(ack).__name__}
+        elif ack is None:
+            results[iid] = {"result": "dropped"}
+        elif ack.ok:
+            sent.append(iid)
+            results[iid] = {"result": "sent", "radio_executed": ack.radio_executed}
+        else:
+            results[iid] = {"result": "failed", "error": ack.error_code}
+
+    if sent:
+        coordinator.track_impulses(sent)
+    _LOGGER.debug("BernerBox: execute_items target=%s -> %s", target, results)
+    return {"target": target, "items": [{"item_id": iid, **res} for iid, res in results.items()]}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    if hass.services.has_service(DOMAIN, SERVICE_EXECUTE_ITEMS):
+        return
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXECUTE_ITEMS,
+        _async_execute_items,
+        schema=EXECUTE_ITEMS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
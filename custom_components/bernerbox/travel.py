@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from statistics import median
+from typing import Any, Deque, Dict, Optional
+
+from .const import TRAVEL_MIN_SAMPLES, TRAVEL_WINDOW
+
+
+@dataclass(frozen=True, slots=True)
+class TravelStats:
+    """Gelernte Fahrzeit eines Tors (Impuls → stabiler Zustand) in Sekunden."""
+
+    median: float
+    p90: float
+    samples: int
+
+
+class TravelTimeModel:
+    """
+    Rollierende Fahrzeit-Statistik je Item (letzte `window` bestätigte Impulse):
+    - Median/p90 erst ab `min_samples` Messungen (vorher gilt das feste Nachfrage-Schema)
+    - als JSON-taugliches Dict im Entry-Store persistiert
+    """
+
+    def __init__(self, *, window: int = TRAVEL_WINDOW, min_samples: int = TRAVEL_MIN_SAMPLES) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[int, Deque[float]] = {}
+
+    def add(self, item_id: int, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        samples = self._samples.get(item_id)
+        if samples is None:
+            samples = self._samples[item_id] = deque(maxlen=self.window)
+        samples.append(round(seconds, 1))
+
+    def stats(self, item_id: int) -> Optional[TravelStats]:
+        samples = self._samples.get(item_id)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        p90 = ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+        return TravelStats(median=float(median(ordered)), p90=float(p90), samples=len(ordered))
+
+    def forget(self, item_id: int) -> None:
+        self._samples.pop(item_id, None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {str(iid): list(samples) for iid, samples in self._samples.items()}
+
+    def load(self, stored: Any) -> None:
+        if not isinstance(stored, dict):
+            return
+        for key, values in stored.items():
+            try:
+                iid = int(key)
+                for v in values:
+                    self.add(iid, float(v))
+            except (TypeError, ValueError):
+                continue
@@ -0,0 +1,30 @@
+"""Gemeinsame Fixtures (pytest-homeassistant-custom-component)."""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+BENCH_RESULTS: List[Dict[str, Any]] = []
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "benchmark: Benchmark gegen die Mock-Box (langsam)")
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """custom_components/bernerbox in jedem Test ladbar machen."""
+    yield
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config) -> None:
+    if not BENCH_RESULTS:
+        return
+    cols = list(BENCH_RESULTS[0])
+    terminalreporter.write_sep("=", "BernerBox Benchmark")
+    terminalreporter.write_line(" | ".join(f"{c:>20}" for c in cols))
+    for row in BENCH_RESULTS:
+        terminalreporter.write_line(" | ".join(f"{row[c]!s:>20}" for c in cols))
@@ -0,0 +1,172 @@
+"""Lokaler Mock der BernerBox-API (aiohttp) für Offline-Tests und Benchmarks.
+
+Simuliert:
+- Antwortlatenz des eingebetteten Webservers
+- internes Polling nach updateAllItemsByUser (~2s pro Item, skalierbar)
+- Torfahrt nach executeItemFunction (Status erst nach dem nächsten internen Poll sichtbar)
+
+Alle Zeiten laufen über asyncio-Timer bzw. time() – mit freezer/async_fire_time_changed also in
+simulierter Zeit, gemeinsam mit den Timern des Coordinators.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+import json
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+API_KEY = "mock-api-key"
+USER_ID = 1
+
+MATCHCODES = {
+    "open": ("item_type_status_auf", "1"),
+    "closed": ("item_type_status_zu", "2"),
+    "moving": ("item_type_status_in_bewegung", "3"),
+}
+
+
+@dataclass
+class MockDoor:
+    item_id: int
+    name: str
+    item_type: str = "1"
+    physical: str = "closed"            # tatsächlicher Zustand des Tors
+    target: Optional[str] = None        # Ziel während der Fahrt
+    arrives_at: float = 0.0             # epoch
+    reported: str = "closed"            # von der Box zuletzt gepollter Zustand
+    timestamp_executed: int = 0
+
+    def settle(self, now: float) -> None:
+        if self.target is not None and now >= self.arrives_at:
+            self.physical = self.target
+            self.target = None
+
+    def as_json(self) -> Dict[str, Any]:
+        mc, sid = MATCHCODES[self.reported]
+        return {
+            "id_item": str(self.item_id),
+            "name": self.name,
+            "id_item_type": self.item_type,
+            "matchcode_item_type_status": mc,
+            "id_item_type_status": sid,
+            "matchcode_item_type_torlage": None,
+            "id_item_type_torlage": None,
+            "matchcode_item_type_error": None,
+            "id_item_type_error": None,
+            "timestamp_executed": self.timestamp_executed,
+        }
+
+
+class MockBernerBox:
+    """aiohttp-App mit den Routen der Box; Zeiten werden mit `time_scale` multipliziert."""
+
+    def __init__(
+        self,
+        n_items: int,
+        *,
+        latency: float = 0.05,
+        item_poll: float = 2.0,
+        travel: float = 15.0,
+        time_scale: float = 1.0,
+    ) -> None:
+        self.doors: Dict[int, MockDoor] = {i: MockDoor(i, f"Tor {i}") for i in range(1, n_items + 1)}
+        self.latency = latency * time_scale
+        self.item_poll = item_poll * time_scale
+        self.travel = travel * time_scale
+        self.requests: Counter[str] = Counter()
+        self.ssh_access = False
+        self._poll_task: asyncio.Task | None = None
+        self._clock = 0
+
+    # ------------------ App ------------------
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/item/getItemsByUser.json/{user_id}", self._get_items)
+        app.router.add_get("/api/item/updateAllItemsByUser.json/{user_id}", self._update_all)
+        app.router.add_post("/api/item/executeItemFunction.json", self._execute)
+        app.router.add_post("/api/v1/Box/restartSystem", self._restart)
+        app.router.add_get("/api/v1/BoxSettings/getAllSettings", self._settings)
+        app.router.add_post("/api/v1/Box/toggleSSHAccess", self._toggle_ssh)
+        app.router.add_post("/api/v1/User/authUser", self._auth)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    async def _cleanup(self, _app: web.Application) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+
+    async def _respond(self, name: str, request: web.Request, body: Any) -> web.Response:
+        self.requests[name] += 1
+        await asyncio.sleep(self.latency)
+        if request.query.get("api_key") != API_KEY and name != "authUser":
+            return web.Response(status=401, text="unauthorized")
+        return web.Response(text=json.dumps(body), content_type="application/json")
+
+    # ------------------ Interne Box-Logik ------------------
+
+    async def _poll_all(self) -> None:
+        """Box fragt nacheinander jedes Item per Funk ab (~item_poll Sekunden je Item)."""
+        for door in list(self.doors.values()):
+            await asyncio.sleep(self.item_poll)
+            door.settle(time())
+            door.reported = "moving" if door.target is not None else door.physical
+            self._clock += 1
+            door.timestamp_executed = self._clock
+
+    # ------------------ Routen ------------------
+
+    async def _get_items(self, request: web.Request) -> web.Response:
+        return await self._respond("getItemsByUser", request, [d.as_json() for d in self.doors.values()])
+
+    async def _update_all(self, request: web.Request) -> web.Response:
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_all())
+        return await self._respond("updateAllItemsByUser", request, True)
+
+    async def _execute(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        door = self.doors.get(int(payload.get("id_item", 0)))
+        if door is None:
+            return await self._respond("executeItemFunction", request, {"status": "ERROR", "info": "unknown_item"})
+        now = time()
+        door.settle(now)
+        if door.target is not None:
+            # Impuls während der Fahrt → Tor bleibt stehen (wie beim echten Antrieb)
+            door.target = None
+        else:
+            door.target = "open" if door.physical == "closed" else "closed"
+            door.arrives_at = now + self.travel
+        return await self._respond("executeItemFunction", request, {"status": "OK", "info": "funk_command_executed"})
+
+    async def _restart(self, request: web.Request) -> web.Response:
+        return await self._respond("restartSystem", request, True)
+
+    async def _settings(self, request: web.Request) -> web.Response:
+        rows: List[Dict[str, Any]] = [
+            {"name": "ssh_access", "value": "1" if self.ssh_access else "0"},
+            {"name": "firmware_version", "value": "mock-1.0"},
+        ]
+        return await self._respond("getAllSettings", request, rows)
+
+    async def _toggle_ssh(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        self.ssh_access = form.get("mode") == "on"
+        return await self._respond("toggleSSHAccess", request, True)
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        return await self._respond("authUser", request, {"status": "OK", "info": [{"api_key": API_KEY, "id": USER_ID}]})
+
+
+async def start_mock_box(box: MockBernerBox) -> Tuple[web.AppRunner, str]:
+    """Mock-Box auf einem freien Port auf 127.0.0.1 starten → (Runner, Basis-URL)."""
+    runner = web.AppRunner(box.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
@@ -0,0 +1,62 @@
+"""API-Client: Lebenszyklus der eigenen Session, bedingte Listen-Abrufe."""
+from __future__ import annotations
+
+from aiohttp import web
+import pytest
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant
+
+from custom_components.bernerbox.api import NOT_MODIFIED, BernerBoxApiClient
+
+
+async def test_own_session_closed_when_hass_closes(hass: HomeAssistant) -> None:
+    api = BernerBoxApiClient(hass, host="http://127.0.0.1:9")
+    session = api._get_session()
+    assert not session.closed
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+    await hass.async_block_till_done()
+
+    assert session.closed and api.closed
+    with pytest.raises(RuntimeError):
+        api._get_session()
+
+
+async def test_close_before_shutdown_drops_listener(hass: HomeAssistant, caplog: pytest.LogCaptureFixture) -> None:
+    api = BernerBoxApiClient(hass, host="http://127.0.0.1:9")
+    session = api._get_session()
+    await api.async_close()
+    assert session.closed
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+    await hass.async_block_till_done()
+    assert "Unable to remove unknown" not in caplog.text
+
+
+async def test_conditional_list_fetch(socket_enabled: None, hass: HomeAssistant) -> None:
+    bodies = [b'[{"id_item": "1"}]', b'[{"id_item": "1"}]', b""]
+
+    async def _items(request: web.Request) -> web.Response:
+        body = bodies.pop(0)
+        if body and request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=body, headers={"ETag": '"v1"'}, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/api/item/getItemsByUser.json/1", _items)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    api = BernerBoxApiClient(hass, host=f"http://{host}:{port}")
+    try:
+        assert await api.get_items_raw() == b'[{"id_item": "1"}]'
+        assert await api.get_items_raw() is NOT_MODIFIED
+        # leerer 200-Body ist eine (kaputte) Antwort, kein „unverändert“
+        empty = await api.get_items_raw()
+        assert empty == b"" and empty is not NOT_MODIFIED
+    finally:
+        await api.async_close()
+        await runner.cleanup()
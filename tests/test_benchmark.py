@@ -0,0 +1,161 @@
+"""Benchmark: echter Coordinator + Entities in einer Test-HA-Instanz gegen die Mock-Box.
+
+Misst je Item-Anzahl (1 / 20 / 200):
+- Requests pro Minute und Box im Idle-Betrieb – gezählt an der Mock-Box, während der Coordinator
+  eine simulierte Stunde lang auf seinen eigenen Timern läuft (adaptives Intervall, Slots,
+  Sicherheits-updateAll, Nachläufe, Einstellungen)
+- Impuls → bestätigter Zustand (simulierte Sekunden) und Requests bis zur Bestätigung
+- State-Writes pro Zyklus (ohne Änderung / alle Items geändert)
+- CPU-Zeit pro Zyklus (Coordinator + Entities; Mock läuft im selben Prozess)
+
+Aufruf: pytest tests/test_benchmark.py -m benchmark -s
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from time import process_time
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_fire_time_changed
+
+from custom_components.bernerbox.const import DOMAIN
+
+from .conftest import BENCH_RESULTS
+from .mock_box import API_KEY, USER_ID, MockBernerBox, start_mock_box
+
+IDLE_WINDOW = 3600          # simulierte Sekunden Idle-Betrieb (enthält einen Einstellungs-Abruf)
+SIM_STEP = 1.0              # Auflösung der simulierten Zeit (Sekunden)
+IDLE_CYCLES = 5
+CONFIRM_TIMEOUT = 600       # simulierte Sekunden (200 Items: ein Box-Durchlauf dauert ~400s)
+
+
+@pytest.fixture
+def expected_lingering_tasks() -> bool:
+    # internes Polling der Mock-Box kann das Test-Ende überdauern
+    return True
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    return True
+
+
+async def _advance(hass: HomeAssistant, freezer: FrozenDateTimeFactory, seconds: float) -> None:
+    """Simulierte Zeit vorspulen; alle fälligen Timer (Coordinator, Nachläufe, Mock-Box) laufen dabei."""
+    elapsed = 0.0
+    while elapsed < seconds:
+        freezer.tick(timedelta(seconds=SIM_STEP))
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        elapsed += SIM_STEP
+
+
+async def _count_state_writes(hass: HomeAssistant, coordinator, cycles: int) -> tuple[float, float]:
+    """(State-Writes der Item-Entities pro Zyklus, CPU-Millisekunden pro Zyklus) über `cycles` Refreshs.
+
+    Box-weite Sensoren (z.B. „Letzte Aktualisierung“, gedrosselt) zählen nicht mit.
+    """
+    writes = 0
+    registry = er.async_get(hass)
+
+    def _on_state(event) -> None:
+        nonlocal writes
+        ent = registry.async_get(event.data["entity_id"])
+        if ent is not None and "-item-" in ent.unique_id:
+            writes += 1
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _on_state)
+    cpu = 0.0
+    try:
+        for _ in range(cycles):
+            t0 = process_time()
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            cpu += process_time() - t0
+    finally:
+        unsub()
+    return writes / cycles, cpu * 1000 / cycles
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("n_items", [1, 20, 200])
+async def test_benchmark(
+    socket_enabled: None, hass: HomeAssistant, freezer: FrozenDateTimeFactory, n_items: int
+) -> None:
+    box = MockBernerBox(n_items, latency=0.0)  # Loop-Uhr ist eingefroren: Latenz nur simuliert sinnvoll
+    runner, url = await start_mock_box(box)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "host": url,
+            "api_key": API_KEY,
+            "user_id": USER_ID,
+            "ids": list(range(1, n_items + 1)),
+            "request_timeout": 6,
+        },
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        assert len(coordinator.data) == n_items
+
+        # --- Idle: Coordinator läuft auf seinen eigenen Timern, gezählt wird an der Box ---
+        box.requests.clear()
+        await _advance(hass, freezer, IDLE_WINDOW)
+        idle_requests = sum(box.requests.values())
+        requests_per_minute = idle_requests * 60 / IDLE_WINDOW
+        updateall_per_minute = box.requests["updateAllItemsByUser"] * 60 / IDLE_WINDOW
+        assert box.requests["getItemsByUser"] > 0
+
+        # --- State-Writes/CPU je Zyklus: keine Änderung an der Box ---
+        box.requests.clear()
+        idle_writes, idle_cpu = await _count_state_writes(hass, coordinator, IDLE_CYCLES)
+        assert box.requests["getItemsByUser"] == IDLE_CYCLES  # genau ein Listen-Request je Zyklus
+
+        # --- alle Items ändern sich (z. B. nach Sammel-Fahrt) ---
+        for door in box.doors.values():
+            door.physical = door.reported = "open"
+            door.timestamp_executed += 1
+        busy_writes, busy_cpu = await _count_state_writes(hass, coordinator, 1)
+
+        # --- Impuls → bestätigter Zustand (über den echten Button, simulierte Zeit) ---
+        entity_id = er.async_get(hass).async_get_entity_id(
+            "button", DOMAIN, f"{DOMAIN}-{entry.entry_id}-item-1-func-1-button"
+        )
+        assert entity_id is not None
+        box.requests.clear()
+        await hass.services.async_call("button", "press", {ATTR_ENTITY_ID: entity_id}, blocking=True)
+        waited = 0.0
+        while 1 not in coordinator.transitions and waited < CONFIRM_TIMEOUT:
+            await _advance(hass, freezer, SIM_STEP)
+            waited += SIM_STEP
+        result = coordinator.transitions.get(1)
+        assert result is not None and result.confirmed
+        assert result.state == "closed"
+        impulse_requests = sum(box.requests.values())
+
+        BENCH_RESULTS.append(
+            {
+                "items": n_items,
+                "impulse→confirmed s": round(waited, 1),
+                "req until confirmed": impulse_requests,
+                "req/min (idle)": round(requests_per_minute, 2),
+                "updateAll/min (idle)": round(updateall_per_minute, 2),
+                "writes/cycle idle": round(idle_writes, 1),
+                "writes/cycle all": round(busy_writes, 1),
+                "cpu ms/cycle idle": round(idle_cpu, 2),
+                "cpu ms/cycle all": round(busy_cpu, 2),
+            }
+        )
+        assert idle_writes == 0
+    finally:
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        await runner.cleanup()
@@ -0,0 +1,172 @@
+"""Schutzschalter: Zustandswechsel, Probe-Backoff und Verhalten des Coordinators bei nicht erreichbarer Box."""
+from __future__ import annotations
+
+from datetime import timedelta
+from time import monotonic
+
+from aiohttp import web
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.bernerbox import breaker as breaker_mod
+from custom_components.bernerbox.api import BernerBoxApiClient
+from custom_components.bernerbox.breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    BernerBoxCircuitBreaker,
+)
+from custom_components.bernerbox.const import DOMAIN
+
+from .mock_box import API_KEY, USER_ID, MockBernerBox, start_mock_box
+
+
+@pytest.fixture
+def expected_lingering_tasks() -> bool:
+    # internes Polling der Mock-Box kann das Test-Ende überdauern
+    return True
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    return True
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list:
+    """Steuerbare monotonic()-Uhr des Schutzschalters ([0] = aktuelle Sekunden)."""
+    now = [1000.0]
+    monkeypatch.setattr(breaker_mod, "monotonic", lambda: now[0])
+    return now
+
+
+def _trip(breaker: BernerBoxCircuitBreaker) -> None:
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+
+
+def test_closed_open_half_open_closed(clock: list) -> None:
+    breaker = BernerBoxCircuitBreaker(threshold=3, base_backoff=10, max_backoff=600)
+    assert breaker.state == STATE_CLOSED and breaker.allow_request()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED          # unter der Schwelle
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN and breaker.trips == 1
+    assert not breaker.allow_request() and breaker.short_circuited == 1
+
+    assert not breaker.probe_due()                # Wartezeit läuft noch
+    assert breaker.next_probe_in() == pytest.approx(10)
+    clock[0] += 10
+    assert breaker.probe_due()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request()            # keine Nutz-Requests im Probe-Slot
+    assert not breaker.probe_due()                # genau eine Probe
+
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED and breaker.failures == 0
+    assert breaker.backoff == 10 and breaker.allow_request()
+
+
+def test_failed_probes_double_backoff_up_to_max(clock: list) -> None:
+    breaker = BernerBoxCircuitBreaker(threshold=1, base_backoff=10, max_backoff=50)
+    _trip(breaker)
+    waits = []
+    for _ in range(4):
+        waits.append(breaker.next_probe_in())
+        clock[0] += breaker.next_probe_in()
+        assert breaker.probe_due()
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+    assert waits == [10, 20, 40, 50]
+    assert breaker.trips == 1                     # fehlgeschlagene Proben lösen nicht erneut aus
+
+    clock[0] += breaker.next_probe_in()
+    assert breaker.probe_due()
+    breaker.record_success()
+    assert breaker.backoff == 10                  # nach Erfolg wieder von vorn
+
+
+def test_probe_left_hanging_is_replaced(clock: list) -> None:
+    breaker = BernerBoxCircuitBreaker(threshold=1, base_backoff=10)
+    _trip(breaker)
+    clock[0] += 10
+    assert breaker.probe_due()
+    clock[0] += 10                                # Probe ohne Ergebnis (abgebrochen)
+    assert breaker.probe_due()
+    assert breaker.state == STATE_HALF_OPEN
+
+
+async def test_only_http_responses_close_the_breaker(hass: HomeAssistant) -> None:
+    api = BernerBoxApiClient(hass, host="http://127.0.0.1:9")
+    _trip(api.breaker)
+    assert api.breaker.is_open
+
+    # Ausnahme ohne HTTP-Antwort (Client geschlossen, Decode-Fehler) sagt nichts über die Box
+    api._record("getItemsByUser", monotonic(), error=True, outcome="RuntimeError")
+    assert api.breaker.is_open
+    # jede HTTP-Antwort heißt „erreichbar“, auch ein Fehlerstatus
+    api._record("probe", monotonic(), status=404)
+    assert not api.breaker.is_open
+
+    api._record("getItemsByUser", monotonic(), error=True, unreachable=True, outcome="ClientConnectorError")
+    assert api.breaker.failures == 1
+    await api.async_close()
+
+
+async def test_coordinator_fails_fast_while_box_unreachable(
+    socket_enabled: None, hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    box = MockBernerBox(2, latency=0.0)
+    runner, url = await start_mock_box(box)
+    port = int(url.rsplit(":", 1)[1])
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": url, "api_key": API_KEY, "user_id": USER_ID, "ids": [1, 2], "request_timeout": 6},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    api = coordinator.api
+    assert coordinator.last_update_success
+
+    # Box weg: Verbindungsfehler bis zur Schwelle, dann offen → UpdateFailed, Entities unavailable
+    await runner.cleanup()
+    for _ in range(api.breaker.threshold):
+        await coordinator.async_refresh()
+    assert api.breaker.state == STATE_OPEN
+    assert not coordinator.last_update_success
+    assert isinstance(coordinator.last_exception, UpdateFailed)
+
+    # offen: kein Request bis zur Probe, weiter UpdateFailed
+    await coordinator.async_refresh()
+    assert api.breaker.state == STATE_OPEN
+    assert isinstance(coordinator.last_exception, UpdateFailed)
+
+    # Probe gegen die noch fehlende Box → wieder offen mit doppelter Wartezeit
+    backoff = api.breaker.backoff
+    freezer.tick(timedelta(seconds=api.breaker.next_probe_in() + 1))
+    await coordinator.async_refresh()
+    assert api.breaker.state == STATE_OPEN
+    assert api.breaker.backoff == 2 * backoff
+
+    # Box wieder da (gleicher Port): Probe antwortet → geschlossen, Liste wieder da
+    runner = web.AppRunner(box.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    box.requests.clear()
+    freezer.tick(timedelta(seconds=api.breaker.next_probe_in() + 1))
+    await coordinator.async_refresh()
+    assert api.breaker.state == STATE_CLOSED
+    assert coordinator.last_update_success
+    assert box.requests["getItemsByUser"] == 1
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await runner.cleanup()
@@ -0,0 +1,171 @@
+"""Inkrementelle Item-Erkennung: _discover / _expire_missing / _async_publish_discovery gegen echte Registries."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import AsyncGenerator, Tuple
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.bernerbox.const import DISCOVERY_MIN_POLLS, DISCOVERY_REMOVE_AFTER, DOMAIN
+
+from .mock_box import API_KEY, USER_ID, MockBernerBox, MockDoor, start_mock_box
+
+N_ITEMS = 5
+
+
+@pytest.fixture
+def expected_lingering_tasks() -> bool:
+    # internes Polling der Mock-Box kann das Test-Ende überdauern
+    return True
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    return True
+
+
+@pytest.fixture
+async def setup_box(
+    socket_enabled: None, hass: HomeAssistant
+) -> AsyncGenerator[Tuple[MockBernerBox, MockConfigEntry], None]:
+    box = MockBernerBox(N_ITEMS, latency=0.0)
+    runner, url = await start_mock_box(box)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "host": url,
+            "api_key": API_KEY,
+            "user_id": USER_ID,
+            "ids": list(range(1, N_ITEMS + 1)),
+            "request_timeout": 6,
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    yield box, entry
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await runner.cleanup()
+
+
+def _item_entities(hass: HomeAssistant, entry: MockConfigEntry, item_id: int) -> list:
+    prefix = f"{DOMAIN}-{entry.entry_id}-item-{item_id}-"
+    return [
+        ent
+        for ent in er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id)
+        if ent.unique_id.startswith(prefix)
+    ]
+
+
+async def _poll(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, entry: MockConfigEntry, times: int, step: float
+) -> None:
+    """`times` Listen-Abrufe im Abstand von `step` simulierten Sekunden."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    for i in range(times):
+        if i:
+            freezer.tick(timedelta(seconds=step))
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+
+async def test_empty_list_removes_nothing(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, setup_box
+) -> None:
+    box, entry = setup_box
+    box.doors.clear()
+
+    await _poll(hass, freezer, entry, DISCOVERY_MIN_POLLS + 2, DISCOVERY_REMOVE_AFTER / 2)
+
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    assert coordinator.ids == list(range(1, N_ITEMS + 1))
+    for iid in range(1, N_ITEMS + 1):
+        assert _item_entities(hass, entry, iid)
+    assert entry.data["ids"] == list(range(1, N_ITEMS + 1))
+
+
+async def test_mass_disappearance_removes_nothing(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, setup_box
+) -> None:
+    box, entry = setup_box
+    for iid in range(2, N_ITEMS + 1):
+        del box.doors[iid]
+
+    await _poll(hass, freezer, entry, DISCOVERY_MIN_POLLS + 2, DISCOVERY_REMOVE_AFTER / 2)
+
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    assert coordinator.ids == list(range(1, N_ITEMS + 1))
+    for iid in range(1, N_ITEMS + 1):
+        assert _item_entities(hass, entry, iid)
+
+
+async def test_single_item_removed_after_grace_period(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, setup_box
+) -> None:
+    box, entry = setup_box
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    dev_reg = dr.async_get(hass)
+    assert _item_entities(hass, entry, 3)
+    assert dev_reg.async_get_device(identifiers={(DOMAIN, f"{entry.entry_id}-item-3")}) is not None
+    del box.doors[3]
+
+    # viele Abrufe, aber noch nicht lange genug verschwunden
+    await _poll(hass, freezer, entry, DISCOVERY_MIN_POLLS + 1, 10)
+    assert 3 in coordinator.ids
+    assert _item_entities(hass, entry, 3)
+
+    freezer.tick(timedelta(seconds=DISCOVERY_REMOVE_AFTER))
+    await _poll(hass, freezer, entry, 1, 0)
+    assert 3 not in coordinator.ids
+    assert not _item_entities(hass, entry, 3)
+    device = dev_reg.async_get_device(identifiers={(DOMAIN, f"{entry.entry_id}-item-3")})
+    assert device is None or entry.entry_id not in device.config_entries
+    assert entry.data["ids"] == [1, 2, 4, 5]
+    # übrige Items bleiben unangetastet
+    assert all(_item_entities(hass, entry, iid) for iid in (1, 2, 4, 5))
+
+
+async def test_item_back_resets_missing_count(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, setup_box
+) -> None:
+    box, entry = setup_box
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    door = box.doors.pop(3)
+
+    await _poll(hass, freezer, entry, DISCOVERY_MIN_POLLS - 1, 10)
+    box.doors[3] = door
+    await _poll(hass, freezer, entry, 1, 10)
+    del box.doors[3]
+    # neue Fehlzeit beginnt von vorn: lange weg, aber erst in zu wenigen Listen in Folge
+    await _poll(hass, freezer, entry, 2, DISCOVERY_REMOVE_AFTER + 1)
+
+    assert 3 in coordinator.ids
+    assert _item_entities(hass, entry, 3)
+
+
+async def test_new_item_added_without_reload(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory, setup_box
+) -> None:
+    box, entry = setup_box
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    new_id = N_ITEMS + 1
+    assert not _item_entities(hass, entry, new_id)
+    box.doors[new_id] = MockDoor(new_id, f"Tor {new_id}")
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert new_id in coordinator.ids
+    platforms = {ent.domain for ent in _item_entities(hass, entry, new_id)}
+    assert {"button", "cover", "sensor"} <= platforms
+    button = er.async_get(hass).async_get_entity_id(
+        "button", DOMAIN, f"{DOMAIN}-{entry.entry_id}-item-{new_id}-func-{new_id}-button"
+    )
+    assert button is not None and hass.states.get(button) is not None
+    assert entry.data["ids"] == list(range(1, new_id + 1))
@@ -0,0 +1,69 @@
+"""Service execute_items: mehrere Tore über die Befehls-Queue."""
+from __future__ import annotations
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.bernerbox.const import DOMAIN, SERVICE_EXECUTE_ITEMS
+
+from .mock_box import API_KEY, USER_ID, MockBernerBox, start_mock_box
+
+
+@pytest.fixture
+def expected_lingering_tasks() -> bool:
+    # internes Polling der Mock-Box kann das Test-Ende überdauern
+    return True
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    return True
+
+
+async def test_exception_for_one_door_does_not_stop_the_others(
+    socket_enabled: None, hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    box = MockBernerBox(3, latency=0.0)
+    runner, url = await start_mock_box(box)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": url, "api_key": API_KEY, "user_id": USER_ID, "ids": [1, 2, 3], "request_timeout": 6},
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        store = hass.data[DOMAIN][entry.entry_id]
+        coordinator, commands = store["coordinator"], store["commands"]
+        commands.spacing = 0.0
+
+        execute = store["api"].execute_item_function
+
+        async def _execute(item_id: int, func_id: int):
+            if item_id == 2:
+                raise ValueError("kaputte Quittung")
+            return await execute(item_id, func_id)
+
+        monkeypatch.setattr(store["api"], "execute_item_function", _execute)
+
+        response = await hass.services.async_call(
+            DOMAIN,
+            SERVICE_EXECUTE_ITEMS,
+            {"config_entry_id": entry.entry_id, "items": [1, 2, 3], "target": "open"},
+            blocking=True,
+            return_response=True,
+        )
+
+        results = {row["item_id"]: row for row in response["items"]}
+        assert results[1]["result"] == "sent" and results[3]["result"] == "sent"
+        assert results[2] == {"item_id": 2, "result": "failed", "error": "ValueError"}
+        # gesendete Tore werden trotzdem bis zur Bestätigung verfolgt
+        assert set(coordinator.pending) == {1, 3}
+        assert box.doors[1].target == "open" and box.doors[3].target == "open"
+        assert box.doors[2].target is None
+    finally:
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        await runner.cleanup()
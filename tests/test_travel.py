@@ -0,0 +1,170 @@
+"""Gelernte Fahrzeit: TravelTimeModel und die Schätzung aus dem Nachfrage-Verlauf eines Impulses."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_fire_time_changed
+
+from custom_components.bernerbox.api import BernerBoxApiClient
+from custom_components.bernerbox.const import DOMAIN
+from custom_components.bernerbox.coordinator import BernerBoxCoordinator, PendingTransition
+from custom_components.bernerbox.travel import TravelTimeModel
+
+from .mock_box import API_KEY, USER_ID, MockBernerBox, start_mock_box
+
+REPOLL = 2.0
+IMPULSES = 8
+
+
+@pytest.fixture
+def expected_lingering_tasks() -> bool:
+    # internes Polling der Mock-Box kann das Test-Ende überdauern
+    return True
+
+
+@pytest.fixture
+def expected_lingering_timers() -> bool:
+    return True
+
+
+# ——— TravelTimeModel ———
+
+def test_model_needs_min_samples() -> None:
+    model = TravelTimeModel(window=10, min_samples=3)
+    model.add(1, 14.0)
+    model.add(1, 16.0)
+    assert model.stats(1) is None
+    model.add(1, 15.0)
+    st = model.stats(1)
+    assert st is not None and st.median == 15.0 and st.p90 == 16.0 and st.samples == 3
+
+
+def test_model_rolling_window_and_invalid_samples() -> None:
+    model = TravelTimeModel(window=3, min_samples=1)
+    model.add(1, 0)
+    model.add(1, -4)
+    assert model.stats(1) is None
+    for seconds in (100, 10, 11, 12):
+        model.add(1, seconds)
+    st = model.stats(1)
+    assert st is not None and st.samples == 3 and st.p90 == 12.0   # 100 ist aus dem Fenster gefallen
+
+
+def test_model_persistence_roundtrip() -> None:
+    model = TravelTimeModel(window=10, min_samples=1)
+    model.add(1, 15.04)
+    model.add(2, 20)
+    restored = TravelTimeModel(window=10, min_samples=1)
+    restored.load({**model.as_dict(), "x": [1], "3": ["kaputt"]})
+    assert restored.as_dict() == {"1": [15.0], "2": [20.0]}
+    restored.forget(2)
+    assert restored.stats(2) is None
+
+
+# ——— Schätzung aus den Nachfrage-Zeitpunkten ———
+
+@pytest.fixture
+def coordinator(hass: HomeAssistant) -> BernerBoxCoordinator:
+    api = BernerBoxApiClient(hass, host="http://127.0.0.1:9")
+    return BernerBoxCoordinator(hass, entry_id="test", api=api, ids=[1])
+
+
+def _pending(**kwargs) -> PendingTransition:
+    return PendingTransition(
+        item_id=1,
+        started=100.0,
+        deadline=300.0,
+        from_state="closed",
+        from_matchcode="item_type_status_zu",
+        from_timestamp=1,
+        repoll=REPOLL,
+        **kwargs,
+    )
+
+
+def _samples(coordinator: BernerBoxCoordinator) -> list:
+    return coordinator.travel.as_dict().get("1", [])
+
+
+async def test_estimate_between_reads(coordinator: BernerBoxCoordinator) -> None:
+    # updateAll bei 103 → Box liest 105 (fährt noch, Liste 106); updateAll 110 → liest 112, Liste 113 bestätigt
+    pt = _pending(prev_probe=103.0, last_probe=110.0, last_checked=106.0, last_old_read=105.0)
+    coordinator._learn_travel(pt, 113.0)
+    assert _samples(coordinator) == [(105.0 + 112.0) / 2 - 100.0]
+
+
+async def test_estimate_uses_read_behind_last_old_list(coordinator: BernerBoxCoordinator) -> None:
+    # Liste bei 104 zeigte noch den Stand vor dem Impuls: untere Grenze ist der Impuls, nicht 104
+    pt = _pending(last_probe=103.0)
+    pt.last_old_read = coordinator._item_read_at(pt, 104.0)
+    assert pt.last_old_read == 100.0
+    # erstes updateAll bestätigt, ohne Median: nur die obere Grenze (Lesen bei 105) ist bekannt
+    coordinator._learn_travel(pt, 106.0)
+    assert _samples(coordinator) == [5.0]
+
+
+async def test_first_probe_confirming_keeps_median(coordinator: BernerBoxCoordinator) -> None:
+    for seconds in (15.0, 15.0, 16.0):
+        coordinator.travel.add(1, seconds)
+    # gelernter Plan: updateAll zum Median (115) bestätigt sofort → Probe/2 wäre 7.5s, Modell bleibt bei 15s
+    pt = _pending(last_probe=115.0, last_checked=101.0, last_old_read=100.0)
+    coordinator._learn_travel(pt, 118.0)
+    assert _samples(coordinator)[-1] == 15.0
+    assert coordinator.travel.stats(1).median == 15.0
+
+
+async def test_estimate_without_own_updateall_uses_list_window(coordinator: BernerBoxCoordinator) -> None:
+    # Bestätigung kam, bevor unser updateAll gelesen wurde (Durchlauf der Box): Fenster der Listen
+    pt = _pending(last_probe=120.0, last_checked=114.0, last_old_read=100.0)
+    coordinator._learn_travel(pt, 118.0)
+    assert _samples(coordinator) == [(114.0 + 118.0) / 2 - 100.0]
+
+
+async def test_learned_travel_matches_mock_door(
+    socket_enabled: None, hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    box = MockBernerBox(1, latency=0.0, travel=15.0)
+    runner, url = await start_mock_box(box)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": url, "api_key": API_KEY, "user_id": USER_ID, "ids": [1], "request_timeout": 6},
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        button = er.async_get(hass).async_get_entity_id(
+            "button", DOMAIN, f"{DOMAIN}-{entry.entry_id}-item-1-func-1-button"
+        )
+        for _ in range(IMPULSES):
+            coordinator.transitions.clear()
+            await hass.services.async_call("button", "press", {ATTR_ENTITY_ID: button}, blocking=True)
+            for _ in range(120):
+                if 1 in coordinator.transitions:
+                    break
+                freezer.tick(timedelta(seconds=1))
+                async_fire_time_changed(hass)
+                await hass.async_block_till_done(wait_background_tasks=True)
+            assert coordinator.transitions[1].confirmed
+            # Tor steht, Debounce ist vorbei
+            freezer.tick(timedelta(seconds=30))
+            async_fire_time_changed(hass)
+            await hass.async_block_till_done(wait_background_tasks=True)
+
+        samples = _samples(coordinator)
+        assert len(samples) == IMPULSES
+        # tatsächliche Fahrzeit 15s: einzelne Schätzungen liegen in einem ~5s breiten Fenster zwischen zwei
+        # Lese-Vorgängen der Box, im Mittel nicht nach unten verzerrt (früher: halbe Probe-Zeit, ~12s im Mittel)
+        assert all(10.0 <= s <= 20.0 for s in samples), samples
+        assert 13.5 <= sum(samples) / len(samples) <= 16.5, samples
+    finally:
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        await runner.cleanup()